@@ -0,0 +1,111 @@
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from forecasting import arima_forecast
+from order_selection import auto_order
+from parallel import parallel_map
+
+
+def rolling_origins(n_points, horizon, n_folds=None, min_train=12, step=1):
+    # Forecast origins (training lengths), latest last. Each fold trains on
+    # series[:origin] and is scored on the next `horizon` points.
+    origins = np.arange(n_points - horizon, min_train - 1, -step)[::-1]
+    return origins if n_folds is None else origins[-n_folds:]
+
+
+def fold_task(task):
+    product_name, history, origin, order, horizon, refit, alpha = task
+    result = {'forecast': None, 'lower': None, 'upper': None, 'order': order, 'fit_seconds': np.nan, 'error': None}
+    train = history[:origin]
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        start = time.perf_counter()
+        try:
+            # 'auto' re-runs the order search on every fold, so its cost is
+            # counted as part of the fit like it would be in production.
+            if order == 'auto':
+                result['order'] = auto_order(train)
+            result['forecast'], result['lower'], result['upper'] = arima_forecast(train, result['order'], horizon, refit=refit, alpha=alpha)
+        except Exception as e:
+            result['error'] = str(e)
+        result['fit_seconds'] = time.perf_counter() - start
+    return result
+
+
+def mase_scale(history, origins, season=1):
+    # Mean absolute (seasonal) naive error of each fold's training window,
+    # from one cumulative sum instead of one pass per fold.
+    errors = np.abs(history[season:] - history[:-season])
+    totals = np.concatenate([[0.0], np.cumsum(errors)])
+    counts = origins - season
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, totals[np.maximum(counts, 0)] / counts, np.nan)
+
+
+def accuracy(actual, forecast, lower, upper, scale):
+    # All arguments are (folds x horizon) arrays except scale, one value per
+    # fold. Returns one value per fold for each metric; MAPE skips zero
+    # actuals and every metric ignores failed (NaN) forecasts.
+    error = np.abs(actual - forecast)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ape = np.where(actual != 0, error / np.abs(actual), np.nan)
+        sape = 2 * error / (np.abs(actual) + np.abs(forecast))
+        mae = np.nanmean(error, axis=1)
+        return {
+            'mape': 100 * np.nanmean(ape, axis=1),
+            'smape': 100 * np.nanmean(sape, axis=1),
+            'mase': mae / scale,
+            'coverage': np.where(np.isnan(forecast), np.nan, (actual >= lower) & (actual <= upper)).mean(axis=1),
+        }
+
+
+def backtest(histories, configs, horizon, n_folds=None, min_train=12, step=1, alpha=0.05, season=1, workers=1, chunksize=None):
+    # configs is a list of (order, refit) pairs; order may be 'auto'. Every
+    # (product, config, fold) fit is an independent task for parallel_map.
+    # Returns one row per fold with its metrics and fit time.
+    histories = {product_name: np.asarray(history, dtype=float) for product_name, history in histories.items()}
+    tasks, keys = [], []
+    for product_name, history in histories.items():
+        for origin in rolling_origins(len(history), horizon, n_folds, min_train, step):
+            for order, refit in configs:
+                tasks.append((product_name, history, origin, order, horizon, refit, alpha))
+                keys.append((product_name, str(order), refit, origin))
+    if not tasks:
+        return pd.DataFrame(columns=['product_name', 'config_order', 'refit', 'origin', 'order', 'fit_seconds', 'error', 'mape', 'smape', 'mase', 'coverage'])
+    results = parallel_map(fold_task, tasks, workers, chunksize)
+
+    folds = pd.DataFrame(keys, columns=['product_name', 'config_order', 'refit', 'origin'])
+    folds['order'] = [str(tuple(result['order'])) if result['order'] != 'auto' else None for result in results]
+    folds['fit_seconds'] = [result['fit_seconds'] for result in results]
+    folds['error'] = [result['error'] for result in results]
+
+    origins = folds['origin'].to_numpy()
+    offsets = origins[:, None] + np.arange(horizon)
+    actual = np.empty((len(tasks), horizon))
+    scale = np.empty(len(tasks))
+    for product_name, rows in folds.groupby('product_name', sort=False).indices.items():
+        actual[rows] = histories[product_name][offsets[rows]]
+        scale[rows] = mase_scale(histories[product_name], origins[rows], season)
+    missing = np.full(horizon, np.nan)
+    forecast, lower, upper = (np.array([missing if result[field] is None else result[field] for result in results]) for field in ('forecast', 'lower', 'upper'))
+    for metric, values in accuracy(actual, forecast, lower, upper, scale).items():
+        folds[metric] = values
+    return folds
+
+
+def summarize(folds):
+    # One row per config: mean accuracy over every fold of every product and
+    # the compute cost of getting it.
+    return folds.groupby(['config_order', 'refit'], sort=False).agg(
+        folds=('origin', 'size'),
+        failed=('error', lambda errors: errors.notna().sum()),
+        mape=('mape', 'mean'),
+        smape=('smape', 'mean'),
+        mase=('mase', 'mean'),
+        coverage=('coverage', 'mean'),
+        fit_seconds=('fit_seconds', 'mean'),
+        total_seconds=('fit_seconds', 'sum'),
+    ).reset_index()
@@ -0,0 +1,170 @@
+import warnings
+
+import numpy as np
+from scipy.stats import norm
+
+# Candidate smoothing parameters. Every candidate is run side by side as an
+# extra column, and each product keeps the one with the lowest in-sample
+# one-step squared error, so no per-product optimiser is needed.
+SMOOTHING_GRID = np.linspace(0.05, 0.95, 19)
+HOLT_GRID = np.linspace(0.05, 0.95, 10)
+
+
+def nanmean(values, axis, keepdims=False):
+    # np.nanmean without the warning for rows that are all NaN (products
+    # with no history in a window); those rows are NaN either way.
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return np.nanmean(values, axis=axis, keepdims=keepdims)
+
+
+def history_matrix(histories):
+    # Stacks series of different lengths into a (products x time) matrix,
+    # right-aligned so the latest points share a column, with NaN before
+    # each series starts. Every forecaster below skips leading NaNs.
+    histories = [np.asarray(history, dtype=float) for history in histories]
+    width = max((len(history) for history in histories), default=0)
+    matrix = np.full((len(histories), width), np.nan)
+    for row, history in zip(matrix, histories):
+        if len(history):
+            row[width - len(history):] = history
+    return matrix
+
+
+def naive(Y, steps, season=12):
+    return np.repeat(Y[:, -1:], steps, axis=1)
+
+
+def seasonal_naive(Y, steps, season=12):
+    # Repeats the last full season; products with less than one season of
+    # history fall back to the naive forecast.
+    if Y.shape[1] < season:
+        return naive(Y, steps)
+    forecast = Y[:, Y.shape[1] - season + np.arange(steps) % season]
+    return np.where(np.isnan(forecast), Y[:, -1:], forecast)
+
+
+def moving_average(Y, steps, season=12, window=3):
+    return np.repeat(nanmean(Y[:, -window:], axis=1, keepdims=True), steps, axis=1)
+
+
+def exp_smoothing(Y, alpha, beta=None):
+    # Runs simple (beta None) or Holt linear exponential smoothing for every
+    # product and every candidate parameter at once; alpha and beta are
+    # arrays of candidates. Returns the final level, trend and in-sample
+    # squared one-step error, each (products x candidates).
+    n_products, n_points = Y.shape
+    level = np.full((n_products, len(alpha)), np.nan)
+    trend = np.zeros_like(level)
+    sse = np.zeros_like(level)
+    for t in range(n_points):
+        y = Y[:, t:t + 1]
+        fitted = level + trend
+        error = y - fitted
+        sse += np.where(np.isnan(error), 0.0, error ** 2)
+        started = ~np.isnan(level)
+        new_level = np.where(started, alpha * y + (1 - alpha) * fitted, y)
+        if beta is not None:
+            trend = np.where(started & ~np.isnan(y), beta * (new_level - level) + (1 - beta) * trend, trend)
+        level = np.where(np.isnan(y), fitted, new_level)
+    return level, trend, sse
+
+
+def ses(Y, steps, season=12, alpha=None):
+    alpha = SMOOTHING_GRID if alpha is None else np.atleast_1d(alpha)
+    level, _, sse = exp_smoothing(Y, alpha)
+    best = np.argmin(sse, axis=1)
+    return np.repeat(level[np.arange(len(Y)), best][:, None], steps, axis=1)
+
+
+def holt(Y, steps, season=12, alpha=None, beta=None):
+    if alpha is None or beta is None:
+        alpha, beta = (grid.ravel() for grid in np.meshgrid(HOLT_GRID, HOLT_GRID))
+    level, trend, sse = exp_smoothing(Y, np.atleast_1d(alpha), np.atleast_1d(beta))
+    rows, best = np.arange(len(Y)), np.argmin(sse, axis=1)
+    return level[rows, best][:, None] + trend[rows, best][:, None] * np.arange(1, steps + 1)
+
+
+def croston(Y, steps, season=12, alpha=0.1):
+    # Smooths non-zero demand sizes and the intervals between them separately
+    # and forecasts their ratio; meant for intermittent series with many
+    # zero periods. Products that never had demand forecast zero.
+    n_products, n_points = Y.shape
+    size = np.full(n_products, np.nan)
+    interval = np.full(n_products, np.nan)
+    since = np.zeros(n_products)
+    for t in range(n_points):
+        y = Y[:, t]
+        since += ~np.isnan(y)
+        demand = y > 0
+        size = np.where(demand, np.where(np.isnan(size), y, alpha * y + (1 - alpha) * size), size)
+        interval = np.where(demand, np.where(np.isnan(interval), since, alpha * since + (1 - alpha) * interval), interval)
+        since = np.where(demand, 0, since)
+    with np.errstate(invalid='ignore'):
+        rate = np.where(np.isnan(size), 0.0, size / interval)
+    return np.repeat(rate[:, None], steps, axis=1)
+
+
+BASELINES = {
+    'naive': naive,
+    'seasonal_naive': seasonal_naive,
+    'moving_average': moving_average,
+    'ses': ses,
+    'holt': holt,
+    'croston': croston,
+}
+
+
+def forecast_all(Y, steps, season=12, methods=tuple(BASELINES)):
+    return {method: BASELINES[method](Y, steps, season) for method in methods}
+
+
+def backtest_baselines(Y, horizon, n_folds=3, season=12, methods=tuple(BASELINES)):
+    # Rolling-origin backtest of every baseline on the whole matrix: one
+    # vectorized call per method and fold. Returns the absolute-error-based
+    # MASE (products x methods) and the per-step forecast errors
+    # (methods x products x folds x horizon); products too short for a fold
+    # get NaN there.
+    n_products, n_points = Y.shape
+    origins = np.arange(n_points - horizon, 0, -1)[:n_folds][::-1]
+    errors = np.full((len(methods), n_products, len(origins), horizon), np.nan)
+    scales = np.full((n_products, len(origins)), np.nan)
+    for k, origin in enumerate(origins):
+        train, actual = Y[:, :origin], Y[:, origin:origin + horizon]
+        # Too little history inside the window to fit anything: leave NaN.
+        enough = np.sum(~np.isnan(train), axis=1) >= 2
+        if origin > 1:
+            scales[:, k] = nanmean(np.abs(np.diff(train, axis=1)), axis=1)
+        for m, method in enumerate(methods):
+            errors[m, :, k] = np.where(enough[:, None], actual - BASELINES[method](train, horizon, season), np.nan)
+    mae = nanmean(np.abs(errors), axis=3)
+    # A perfect forecast of a flat window scores 0 rather than 0 / 0.
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mase = nanmean(np.where(mae == 0, 0.0, mae / scales[None]), axis=2).T
+    return mase, errors
+
+
+def route(Y, steps, horizon=3, n_folds=3, season=12, threshold=1.0, alpha=0.05, methods=tuple(BASELINES)):
+    # Picks the baseline with the lowest backtest MASE for every product and
+    # flags the product for ARIMA when even that baseline scores above
+    # `threshold` (or could not be backtested at all). Baseline intervals are
+    # Gaussian, from the backtest RMSE at each horizon step; steps past the
+    # backtest horizon scale the last step's RMSE by sqrt(h / horizon), as a
+    # random walk's would grow. Widths never shrink with the step, which a
+    # handful of folds can otherwise produce.
+    # Returns (method per product, use_arima mask, forecast, lower, upper).
+    mase, errors = backtest_baselines(Y, horizon, n_folds, season, methods)
+    scored = ~np.all(np.isnan(mase), axis=1)
+    best = np.argmin(np.where(np.isnan(mase), np.inf, mase), axis=1)
+    rows = np.arange(len(Y))
+    best_mase = mase[rows, best]
+    use_arima = ~scored | ~(best_mase <= threshold)
+
+    forecasts = forecast_all(Y, steps, season, methods)
+    forecast = np.stack([forecasts[method] for method in methods])[best, rows]
+    rmse = np.sqrt(nanmean(errors[best, rows] ** 2, axis=1))
+    h = np.arange(1, steps + 1)
+    rmse = rmse[:, np.minimum(h, horizon) - 1] * np.sqrt(np.maximum(h / horizon, 1.0))
+    rmse = np.fmax.accumulate(rmse, axis=1)
+    spread = norm.ppf(1 - alpha / 2) * rmse
+    return np.array(methods)[best], use_arima, forecast, forecast - spread, forecast + spread
@@ -0,0 +1,280 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+from baselines import history_matrix, route
+from chart_kinds import CHART_KINDS
+from columnar_store import ColumnarStore
+from forecast_codec import encode_forecast_document
+from forecasting import DEFAULT_ORDER
+from ingestion import DEFAULT_FREQ, forecast_index, history_freq, load_histories, stream_series
+from model_store import ModelStore
+from order_selection import CRITERIA, load_order_cache, save_order_cache, select_orders
+from parallel import parallel_forecast
+from persistence import MONGO_URI, ForecastWriter, get_collection
+from seasonal import DEFAULT_HARMONICS, DEFAULT_SEASONAL_ORDER, FOURIER_THRESHOLD, SEASONAL_METHODS, seasonal_fields
+
+FORECAST_COLUMNS = ['product_name', 'step', 'date', 'forecast', 'lower', 'upper']
+FORECAST_DTYPES = {'product_name': 'string', 'step': 'int64', 'date': 'timestamp[ns]', 'forecast': 'float64', 'lower': 'float64', 'upper': 'float64'}
+TIERS = ('arima', 'route', 'baseline')
+
+
+class TableWriter:
+    # Appends forecast frames batch by batch to a CSV or Parquet file, so the
+    # whole catalogue's forecasts never have to be held at once.
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = os.path.splitext(path)[1].lower() in ('.parquet', '.pq')
+        self.writer = None
+        self.rows = 0
+
+    def write(self, frame):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            # A fixed schema, rather than the first batch's, so an empty or
+            # all-object first batch cannot clash with the ones after it.
+            schema = pa.schema([(name, pa.type_for_alias(dtype)) for name, dtype in FORECAST_DTYPES.items()])
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(self.path, schema)
+            self.writer.write_table(pa.Table.from_pandas(frame[FORECAST_COLUMNS], schema=schema, preserve_index=False))
+        else:
+            frame.to_csv(self.path, mode='a' if self.rows else 'w', header=not self.rows, index=False)
+        self.rows += len(frame)
+
+    def close(self):
+        if not self.rows and self.writer is None:
+            self.write(pd.DataFrame(columns=FORECAST_COLUMNS))
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+def batched(pairs, size):
+    batch = {}
+    for product_name, history in pairs:
+        batch[product_name] = history
+        if len(batch) >= size:
+            yield batch
+            batch = {}
+    if batch:
+        yield batch
+
+
+def forecast_frame(product_name, history, forecast, lower, upper):
+    return pd.DataFrame({
+        'product_name': product_name,
+        'step': np.arange(1, len(forecast) + 1),
+        'date': forecast_index(history.index, len(forecast)),
+        'forecast': forecast,
+        'lower': lower,
+        'upper': upper,
+    })
+
+
+def forecast_histories(histories, order=DEFAULT_ORDER, forecast_steps=12, refit=False, alpha=0.05, workers=1, chunksize=None, model_store=None, seasonal=None):
+    # order may be a single (p, d, q) for every product or a dict mapping each
+    # product to its own order, as returned by order_selection.select_orders.
+    frames = []
+    failed = []
+    orders = {product_name: [product_order] for product_name, product_order in order.items()} if isinstance(order, dict) else [order]
+    model_store_dir = model_store.directory if model_store else None
+    results = parallel_forecast(histories, orders, forecast_steps, workers=workers, chunksize=chunksize, refit=refit, alpha=alpha, model_store_dir=model_store_dir, seasonal=seasonal)
+    if model_store:
+        model_store.evict()
+    for result in results:
+        product_name = result['product_name']
+        if result['error'] is not None:
+            print(f"Error occurred while forecasting {product_name}: {result['error']}", file=sys.stderr)
+            failed.append(product_name)
+            continue
+        frames.append(forecast_frame(product_name, histories[product_name], result['forecast'], result['lower'], result['upper']))
+    if not frames:
+        return pd.DataFrame(columns=FORECAST_COLUMNS), failed
+    return pd.concat(frames, ignore_index=True), failed
+
+
+def baseline_tier(histories, forecast_steps, tier='route', threshold=1.0, alpha=0.05, season=12, horizon=3, n_folds=3):
+    # Forecasts the whole batch with the vectorized baselines in one go.
+    # Returns the baseline forecasts of the products they are good enough
+    # for, the histories left for ARIMA and the model used per product.
+    names = list(histories)
+    methods, use_arima, forecast, lower, upper = route(history_matrix(histories.values()), forecast_steps, horizon, n_folds, season, threshold, alpha)
+    if tier == 'baseline':
+        use_arima[:] = False
+    frames = [
+        forecast_frame(product_name, histories[product_name], forecast[i], lower[i], upper[i])
+        for i, product_name in enumerate(names) if not use_arima[i]
+    ]
+    models = {product_name: 'arima' if use_arima[i] else str(methods[i]) for i, product_name in enumerate(names)}
+    remaining = {product_name: histories[product_name] for i, product_name in enumerate(names) if use_arima[i]}
+    return frames, remaining, models
+
+
+def store_forecasts(forecasts, histories, order, writer, models=None, seasonal=None):
+    # seasonal is the (period, method, seasonal_order, harmonics) spec the
+    # ARIMA products were fitted with, if any.
+    for product_name, group in forecasts.groupby('product_name', sort=False):
+        history = histories[product_name]
+        model = models[product_name] if models else 'arima'
+        fields = {'model': model}
+        if model == 'arima':
+            fields['order'] = list(order[product_name] if isinstance(order, dict) else order)
+            if seasonal:
+                fields.update(seasonal_fields(*seasonal))
+        writer.add(encode_forecast_document(
+            product_name, history.to_numpy(), group['forecast'].to_numpy(), group['lower'].to_numpy(), group['upper'].to_numpy(),
+            start=history.index[0], freq=history_freq(history.index), forecast_steps=len(group), **fields,
+        ))
+
+
+def chart_jobs(forecasts, histories):
+    for product_name, group in forecasts.groupby('product_name', sort=False):
+        yield product_name, histories[product_name], group['forecast'].to_numpy(), pd.DatetimeIndex(group['date'])
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Forecast demand for every product in a CSV/Parquet file without opening the GUI.")
+    parser.add_argument('input', help="CSV or Parquet file in long format (one row per product and date)")
+    parser.add_argument('output', help="CSV or Parquet file to write the forecasts to")
+    parser.add_argument('--steps', type=int, default=12, help="number of periods to forecast")
+    parser.add_argument('--order', nargs='+', default=list(map(str, DEFAULT_ORDER)), metavar='P D Q', help="ARIMA order as three integers, or 'auto' to search it per product")
+    parser.add_argument('--criterion', choices=CRITERIA, default='aic', help="information criterion used by --order auto")
+    parser.add_argument('--order-cache', default=None, help="JSON file caching the orders chosen by --order auto")
+    parser.add_argument('--tier', choices=TIERS, default='arima', help="'route' forecasts with the cheap baselines and uses ARIMA only where they backtest poorly; 'baseline' never uses ARIMA")
+    parser.add_argument('--route-horizon', type=int, default=3, help="steps ahead each baseline is backtested over; interval widths past it grow with sqrt(step / horizon)")
+    parser.add_argument('--route-folds', type=int, default=3, help="rolling origins each baseline is backtested on")
+    parser.add_argument('--route-threshold', type=float, default=1.0, help="backtest MASE above which --tier route sends a product to ARIMA")
+    parser.add_argument('--season', type=int, default=12, help="season length used by the seasonal naive baseline")
+    parser.add_argument('--seasonal-period', type=int, default=0, help="season length in periods (e.g. 12 for monthly, 52 for weekly data); 0 fits non-seasonal models")
+    parser.add_argument('--seasonal-method', choices=SEASONAL_METHODS, default='auto', help=f"'sarima' state space, 'fourier' regressors, or 'auto': SARIMA up to a period of {FOURIER_THRESHOLD}, Fourier above")
+    parser.add_argument('--seasonal-order', type=int, nargs=3, default=list(DEFAULT_SEASONAL_ORDER), metavar=('P', 'D', 'Q'))
+    parser.add_argument('--harmonics', type=int, default=DEFAULT_HARMONICS, help="sin/cos pairs used by the Fourier method")
+    parser.add_argument('--refit', action='store_true', help="refit the model after every forecast step")
+    parser.add_argument('--alpha', type=float, default=0.05, help="significance level of the confidence intervals")
+    parser.add_argument('--workers', type=int, default=1, help="number of worker processes (0 uses every core)")
+    parser.add_argument('--chunksize', type=int, default=None, help="products sent to a worker at a time")
+    parser.add_argument('--model-store', default=None, help="directory of saved model parameters; products with new observations are updated from them instead of refitted")
+    parser.add_argument('--model-store-size', type=int, default=10000, help="maximum number of saved models before the least recently used are evicted")
+    parser.add_argument('--mongo-db', default=None, help="also store the forecasts in this MongoDB database")
+    parser.add_argument('--mongo-uri', default=MONGO_URI)
+    parser.add_argument('--flush-size', type=int, default=500, help="documents buffered per MongoDB bulk write")
+    parser.add_argument('--flush-interval', type=float, default=5.0, help="seconds after which buffered documents are written regardless of --flush-size")
+    parser.add_argument('--store', default=None, metavar='DIR', help="also append the forecasts as a new run to this columnar store (see columnar_store.py)")
+    parser.add_argument('--charts', default=None, metavar='DIR', help="render a chart per product into this directory")
+    parser.add_argument('--chart-kinds', nargs='+', choices=CHART_KINDS, default=['bar'])
+    parser.add_argument('--freq', default=DEFAULT_FREQ, help="pandas frequency the histories are aggregated to (e.g. M, W, D)")
+    parser.add_argument('--batch-size', type=int, default=1000, help="products forecast and written per batch")
+    parser.add_argument('--read-chunksize', type=int, default=100_000, help="input rows read at a time")
+    parser.add_argument('--in-memory', action='store_true', help="load the whole input at once; needed when a product's rows are not contiguous")
+    parser.add_argument('--report', default=None, metavar='JSON', help="write per-stage timings and counters of the run to this file")
+    parser.add_argument('--profile', default=None, metavar='PSTATS', help="profile the run with cProfile and dump the stats to this file")
+    parser.add_argument('--trace-memory', action='store_true', help="trace allocations with tracemalloc and add peak memory and top allocation sites to the report")
+    parser.add_argument('--product-col', default='product_name')
+    parser.add_argument('--date-col', default='date')
+    parser.add_argument('--demand-col', default='demand')
+    return parser
+
+
+def parse_order(parser, values):
+    if values == ['auto']:
+        return 'auto'
+    try:
+        order = tuple(int(value) for value in values)
+    except ValueError:
+        order = ()
+    if len(order) != 3:
+        parser.error("--order takes three integers P D Q or 'auto'")
+    return order
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    order = parse_order(parser, args.order)
+    if args.seasonal_period and args.refit:
+        parser.error("--refit cannot be combined with --seasonal-period")
+    run = instrumentation.new_run('batch_forecast')
+    with instrumentation.profiled(run, args.profile, args.trace_memory):
+        status = run_batches(args, order)
+    if args.report:
+        run.write_report(args.report)
+        print(f"Wrote run report to {args.report}.")
+    return status
+
+
+def run_batches(args, order):
+    if args.in_memory:
+        series = load_histories(args.input, args.freq, args.product_col, args.date_col, args.demand_col).items()
+    else:
+        series = stream_series(args.input, args.freq, args.read_chunksize, args.product_col, args.date_col, args.demand_col)
+    cache = load_order_cache(args.order_cache) if order == 'auto' else None
+    model_store = ModelStore(args.model_store, args.model_store_size) if args.model_store else None
+    seasonal = (args.seasonal_period, args.seasonal_method, tuple(args.seasonal_order), args.harmonics) if args.seasonal_period else None
+    mongo_writer = ForecastWriter(get_collection(args.mongo_db, uri=args.mongo_uri), flush_size=args.flush_size, flush_interval=args.flush_interval) if args.mongo_db else None
+    table_writer = TableWriter(args.output)
+    # Named after the run report, so a stored run can be matched to it.
+    store_writer = ColumnarStore(args.store).writer(instrumentation.current_run().run_id, input=args.input) if args.store else None
+    n_products, n_failed, n_baseline, n_charts, n_rendered = 0, 0, 0, 0, 0
+    try:
+        for histories in batched(instrumentation.timed(series, 'read'), args.batch_size):
+            baseline_frames, arima_histories, models = [], histories, None
+            if args.tier != 'arima':
+                with instrumentation.stage('baselines'):
+                    baseline_frames, arima_histories, models = baseline_tier(histories, args.steps, args.tier, args.route_threshold, args.alpha, args.season, args.route_horizon, args.route_folds)
+                n_baseline += len(histories) - len(arima_histories)
+            batch_order = order
+            if order == 'auto':
+                with instrumentation.stage('select_orders'):
+                    batch_order = select_orders(arima_histories, cache, criterion=args.criterion, workers=args.workers or None)
+            with instrumentation.stage('forecast'):
+                forecasts, failed = forecast_histories(arima_histories, batch_order, args.steps, args.refit, args.alpha, args.workers or None, args.chunksize, model_store, seasonal)
+            if baseline_frames:
+                # Back into input order, so the output does not depend on routing.
+                position = {product_name: i for i, product_name in enumerate(histories)}
+                forecasts = pd.concat(baseline_frames + ([forecasts] if len(forecasts) else []), ignore_index=True)
+                forecasts = forecasts.sort_values('product_name', key=lambda names: names.map(position), kind='stable', ignore_index=True)
+            with instrumentation.stage('write_output'):
+                table_writer.write(forecasts)
+                if store_writer:
+                    store_writer.write(forecasts)
+            if args.charts:
+                # Imported here so runs without charts never load matplotlib.
+                from rendering import render_charts
+                with instrumentation.stage('charts'):
+                    charts = render_charts(chart_jobs(forecasts, histories), args.charts, args.chart_kinds, workers=args.workers or None)
+                n_charts += len(charts)
+                n_rendered += sum(rendered for *_, rendered in charts)
+            if mongo_writer:
+                store_forecasts(forecasts, histories, batch_order, mongo_writer, models, seasonal)
+            n_products += len(histories)
+            n_failed += len(failed)
+        if store_writer:
+            store_writer.close()
+    finally:
+        table_writer.close()
+        if store_writer:
+            # Discards the run unless it was published above.
+            store_writer.abort()
+        if mongo_writer:
+            mongo_writer.close()
+        if cache is not None and args.order_cache:
+            save_order_cache(cache, args.order_cache)
+    instrumentation.count('products', n_products)
+    instrumentation.count('products_failed', n_failed)
+    instrumentation.count('output_bytes', os.path.getsize(args.output))
+    if args.charts:
+        print(f"Rendered {n_rendered} of {n_charts} charts into {args.charts}.")
+    if args.tier != 'arima':
+        print(f"{n_baseline} of {n_products} products were forecast by a baseline model.")
+    print(f"Forecasted {n_products - n_failed} of {n_products} products into {args.output}.")
+    return 1 if n_failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
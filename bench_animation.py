@@ -0,0 +1,84 @@
+import argparse
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from bar_animation import ForecastBarAnimation, december_threshold
+
+
+def sample_data(forecast_steps, seed=0):
+    rng = np.random.default_rng(seed)
+    history = pd.Series([120, 130, 150, 170, 190, 210, 220, 240, 280, 290, 310, 350], index=pd.date_range(start='2023-01-31', periods=12, freq='M'), dtype=float)
+    forecast = 350 + np.cumsum(rng.normal(5, 10, size=forecast_steps))
+    forecast_dates = history.index[-1] + pd.DateOffset(months=1) * np.arange(1, forecast_steps + 1)
+    return history, forecast, forecast_dates
+
+
+def legacy_update(ax, history, forecast, frame):
+    # The per-frame body of the original update_bar_plot: clear the axes and
+    # rebuild every bar, label, tick and the legend.
+    ax.clear()
+    ax.bar(history.index, history.values, label='Actual Demand', align='center', width=10)
+    forecast_dates = history.index[-1] + pd.DateOffset(months=1) * np.arange(1, frame + 1)
+    threshold = december_threshold(history)
+    for i in range(frame):
+        color = 'red' if forecast[i] < threshold else 'green'
+        ax.bar(forecast_dates[i], forecast[i], label='Forecasted Demand', align='center', width=10, color=color, alpha=0.4)
+        ax.text(forecast_dates[i], forecast[i], f"{forecast_dates[i].strftime('%b')[:3]}", ha='center', va='bottom')
+    ax.set_xticks(history.index.union(forecast_dates))
+    ax.set_xticklabels([date.strftime('%b') for date in history.index.union(forecast_dates)])
+    ax.set_title('Demand Forecasting with ARIMA')
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Demand')
+    ax.legend()
+
+
+def time_legacy(forecast_steps):
+    history, forecast, forecast_dates = sample_data(forecast_steps)
+    fig = Figure(figsize=(10, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    frame_times = []
+    for frame in range(forecast_steps + 1):
+        start = time.perf_counter()
+        legacy_update(ax, history, forecast, frame)
+        fig.canvas.draw()
+        frame_times.append(time.perf_counter() - start)
+    return np.array(frame_times)
+
+
+def time_blitted(forecast_steps):
+    # One full draw, then each frame only draws and blits the new bar.
+    history, forecast, forecast_dates = sample_data(forecast_steps)
+    fig = Figure(figsize=(10, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    animation = ForecastBarAnimation(ax, history, forecast, forecast_dates)
+    fig.canvas.draw()
+    frame_times = []
+    for frame in range(forecast_steps + 1):
+        start = time.perf_counter()
+        animation.update(frame)
+        frame_times.append(time.perf_counter() - start)
+    return np.array(frame_times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-frame render time of the legacy full-redraw animation and the blitted one.")
+    parser.add_argument('--steps', type=int, nargs='+', default=[12, 50, 100])
+    args = parser.parse_args()
+
+    print(f"{'steps':>6} {'renderer':>9} {'mean ms':>8} {'last ms':>8} {'total s':>8}")
+    for forecast_steps in args.steps:
+        for name, timer in (('legacy', time_legacy), ('blitted', time_blitted)):
+            frame_times = timer(forecast_steps) * 1000
+            print(f"{forecast_steps:>6} {name:>9} {frame_times.mean():>8.2f} {frame_times[-1]:>8.2f} {frame_times.sum() / 1000:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+import argparse
+import time
+import warnings
+
+from baselines import BASELINES, history_matrix, route
+from bench_parallel import synthetic_catalogue
+from forecasting import DEFAULT_ORDER, arima_forecast
+
+
+def run_benchmark(n_products, n_months, steps, arima_sample):
+    Y = history_matrix(synthetic_catalogue(n_products, n_months).values())
+    rows = []
+    for method, forecaster in BASELINES.items():
+        start = time.perf_counter()
+        forecaster(Y, steps)
+        seconds = time.perf_counter() - start
+        rows.append({'model': method, 'products': n_products, 'seconds': seconds, 'products_per_second': n_products / seconds})
+
+    start = time.perf_counter()
+    _, use_arima, *_ = route(Y, steps)
+    seconds = time.perf_counter() - start
+    rows.append({'model': 'route', 'products': n_products, 'seconds': seconds, 'products_per_second': n_products / seconds, 'to_arima': int(use_arima.sum())})
+
+    # ARIMA is timed on a sample; fitting the whole catalogue would dominate.
+    sample = Y[:arima_sample]
+    start = time.perf_counter()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        for history in sample:
+            arima_forecast(history, DEFAULT_ORDER, steps)
+    seconds = time.perf_counter() - start
+    rows.append({'model': 'arima', 'products': len(sample), 'seconds': seconds, 'products_per_second': len(sample) / seconds})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare throughput of the vectorized baseline forecasters with per-product ARIMA fits.")
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--months', type=int, default=36)
+    parser.add_argument('--steps', type=int, default=12)
+    parser.add_argument('--arima-sample', type=int, default=50, help="products fitted with ARIMA to estimate its throughput")
+    args = parser.parse_args()
+
+    print(f"{'model':>15} {'products':>9} {'seconds':>9} {'products/s':>12}")
+    for row in run_benchmark(args.products, args.months, args.steps, args.arima_sample):
+        extra = f"  ({row['to_arima']} routed to ARIMA)" if 'to_arima' in row else ''
+        print(f"{row['model']:>15} {row['products']:>9} {row['seconds']:>9.3f} {row['products_per_second']:>12.0f}{extra}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import time
+
+import bson
+import numpy as np
+import pandas as pd
+
+from forecast_codec import encode_forecast_document, read_forecast_block
+
+
+def legacy_document(product_name, history, forecast, lower, upper, dates):
+    # The original layout (a Python list of ints and a PNG path), extended
+    # with the forecast as plain lists so both layouts carry the same data.
+    return {
+        'product_name': product_name,
+        'demand': [int(value) for value in history],
+        'forecast_steps': len(forecast),
+        'graph_data': f"forecast_plot_{product_name}.png",
+        'dates': list(dates.to_pydatetime()),
+        'forecast': forecast.tolist(),
+        'lower': lower.tolist(),
+        'upper': upper.tolist(),
+    }
+
+
+def make_documents(n_products, n_history, n_forecast, seed=0):
+    rng = np.random.default_rng(seed)
+    history = rng.integers(100, 400, size=(n_products, n_history)).astype(float)
+    forecast = rng.uniform(100, 400, size=(n_products, n_forecast))
+    dates = pd.date_range(start='2023-01-31', periods=n_history + n_forecast, freq='M')
+    legacy, compact = [], []
+    for i in range(n_products):
+        product_name = f"product_{i}"
+        lower, upper = forecast[i] - 50, forecast[i] + 50
+        legacy.append(legacy_document(product_name, history[i], forecast[i], lower, upper, dates))
+        compact.append(encode_forecast_document(product_name, history[i], forecast[i], lower, upper, start=dates[0], freq='M', forecast_steps=n_forecast))
+    return legacy, compact
+
+
+def read_legacy(raw):
+    documents = bson.decode_all(raw)
+    return np.array([document['forecast'] for document in documents], dtype=np.float32)
+
+
+def read_compact(raw):
+    return read_forecast_block(bson.decode_all(raw))[1]
+
+
+def run_benchmark(n_products, n_history, n_forecast, repeats=5):
+    rows = []
+    for layout, documents, reader in zip(('legacy', 'compact'), make_documents(n_products, n_history, n_forecast), (read_legacy, read_compact)):
+        encoded = [bson.encode(document) for document in documents]
+        raw = b''.join(encoded)
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            block = reader(raw)
+            timings.append(time.perf_counter() - start)
+        seconds = min(timings)
+        rows.append({
+            'layout': layout,
+            'bytes_per_document': len(raw) / n_products,
+            'read_seconds': seconds,
+            'products_per_second': n_products / seconds,
+            'shape': block.shape,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare document size and read throughput of the legacy and compact forecast layouts.")
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--history', type=int, default=36)
+    parser.add_argument('--steps', type=int, default=12)
+    args = parser.parse_args()
+
+    print(f"{'layout':>8} {'bytes/doc':>10} {'read s':>8} {'products/s':>12}  shape")
+    for row in run_benchmark(args.products, args.history, args.steps):
+        print(f"{row['layout']:>8} {row['bytes_per_document']:>10.0f} {row['read_seconds']:>8.4f} {row['products_per_second']:>12.0f}  {row['shape']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from columnar_store import ColumnarStore
+
+
+def synthetic_forecasts(n_products, steps, seed=0):
+    rng = np.random.default_rng(seed)
+    forecast = rng.normal(500, 50, n_products * steps)
+    return pd.DataFrame({
+        'product_name': np.repeat([f"product_{i}" for i in range(n_products)], steps),
+        'step': np.tile(np.arange(1, steps + 1), n_products),
+        'date': np.tile(pd.date_range('2024-01-31', periods=steps, freq='M'), n_products),
+        'forecast': forecast,
+        'lower': forecast - 40,
+        'upper': forecast + 40,
+    })
+
+
+def timed(func, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def run_benchmark(n_products, steps, n_runs, lookups):
+    forecasts = synthetic_forecasts(n_products, steps)
+    products = [f"product_{i}" for i in np.random.default_rng(1).integers(0, n_products, lookups)]
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, 'forecasts.csv')
+        _, csv_write = timed(lambda: forecasts.to_csv(csv_path, index=False))
+        store = ColumnarStore(os.path.join(directory, 'store'))
+        append_times = [timed(lambda: store.append_run(forecasts))[1] for _ in range(n_runs)]
+        _, csv_lookup = timed(lambda: [pd.read_csv(csv_path).query('product_name == @name') for name in products[:3]], 1)
+        run, open_time = timed(lambda: ColumnarStore(store.directory).open_run())
+        _, store_lookup = timed(lambda: [run.product(name)['forecast'].sum() for name in products])
+        _, catalogue = timed(lambda: run.catalogue()['forecast'].sum())
+    return {
+        'csv write': csv_write,
+        f"store append (mean of {n_runs})": np.mean(append_times),
+        'store append (last)': append_times[-1],
+        'csv lookup per product': csv_lookup / 3,
+        'store open latest run': open_time,
+        'store lookup per product': store_lookup / len(products),
+        'store whole-catalogue sum': catalogue,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare appending to and reading from the columnar forecast store with a CSV export.")
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--steps', type=int, default=12)
+    parser.add_argument('--runs', type=int, default=5, help="runs appended, to show append time does not grow with earlier runs")
+    parser.add_argument('--lookups', type=int, default=1000)
+    args = parser.parse_args()
+
+    for name, seconds in run_benchmark(args.products, args.steps, args.runs, args.lookups).items():
+        print(f"{name:>28} {seconds * 1000:>10.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import time
+import warnings
+
+import numpy as np
+
+import forecasting
+from forecasting import DEFAULT_ORDER, arima_forecast
+
+SAMPLE_DEMAND = [120, 130, 150, 170, 190, 210, 220, 240, 280, 290, 310, 350]
+
+
+def count_fits():
+    counter = {'fits': 0}
+    fit_arima = forecasting.fit_arima
+
+    def counting_fit_arima(history, order):
+        counter['fits'] += 1
+        return fit_arima(history, order)
+
+    forecasting.fit_arima = counting_fit_arima
+    return counter, fit_arima
+
+
+def run_benchmark(horizons, repeats, order=DEFAULT_ORDER, demand=SAMPLE_DEMAND):
+    rows = []
+    counter, fit_arima = count_fits()
+    try:
+        for steps in horizons:
+            for refit in (True, False):
+                counter['fits'] = 0
+                timings = []
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    arima_forecast(demand, order, steps, refit=refit)
+                    timings.append(time.perf_counter() - start)
+                rows.append({
+                    'steps': steps,
+                    'mode': 'refit' if refit else 'single',
+                    'fits': counter['fits'] // repeats,
+                    'seconds': float(np.median(timings)),
+                })
+    finally:
+        forecasting.fit_arima = fit_arima
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark single-fit vs recursive-refit ARIMA forecasting.")
+    parser.add_argument('--horizons', type=int, nargs='+', default=[1, 6, 12, 24])
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore')
+    print(f"{'steps':>6} {'mode':>7} {'fits':>5} {'seconds':>9}")
+    for row in run_benchmark(args.horizons, args.repeats):
+        print(f"{row['steps']:>6} {row['mode']:>7} {row['fits']:>5} {row['seconds']:>9.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+import argparse
+import time
+
+import numpy as np
+
+from hierarchy import RECONCILERS, coherence_error, reconcile, summing_matrix
+
+
+def synthetic_hierarchy(n_products, n_categories, n_divisions, n_months=36, steps=12, seed=0):
+    # Random base forecasts that do not add up, with every aggregate's
+    # history the sum of its products.
+    rng = np.random.default_rng(seed)
+    products = [f"product_{i}" for i in range(n_products)]
+    category = rng.integers(0, n_categories, size=n_products)
+    levels = [
+        ('division', {product_name: f"division_{c % n_divisions}" for product_name, c in zip(products, category)}),
+        ('category', {product_name: f"category_{c}" for product_name, c in zip(products, category)}),
+    ]
+    S, nodes = summing_matrix(products, levels)
+    history = S @ rng.uniform(0, 100, size=(n_products, n_months))
+    forecasts = history[:, -steps:] * rng.uniform(0.8, 1.2, size=(S.shape[0], steps))
+    weights = rng.uniform(0.5, 2.0, size=S.shape[0]) * history.mean(axis=1)
+    return S, history, forecasts, weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time sparse hierarchical reconciliation for large product catalogues.")
+    parser.add_argument('--products', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--categories', type=int, default=200)
+    parser.add_argument('--divisions', type=int, default=10)
+    parser.add_argument('--steps', type=int, default=12)
+    args = parser.parse_args()
+
+    print(f"{'products':>9} {'nodes':>7} {'method':>10} {'seconds':>9} {'max gap':>10}")
+    for n_products in args.products:
+        start = time.perf_counter()
+        S, history, forecasts, weights = synthetic_hierarchy(n_products, args.categories, args.divisions, steps=args.steps)
+        build = time.perf_counter() - start
+        print(f"{n_products:>9} {S.shape[0]:>7} {'build S':>10} {build:>9.3f}")
+        for method in RECONCILERS:
+            start = time.perf_counter()
+            reconciled = reconcile(method, S, forecasts, history, weights)
+            seconds = time.perf_counter() - start
+            print(f"{n_products:>9} {S.shape[0]:>7} {method:>10} {seconds:>9.3f} {coherence_error(S, reconciled):>10.2e}")
+
+
+if __name__ == '__main__':
+    main()
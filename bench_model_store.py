@@ -0,0 +1,47 @@
+import argparse
+import tempfile
+import time
+import warnings
+
+from bench_parallel import synthetic_catalogue
+from forecasting import DEFAULT_ORDER, fit_arima
+from model_store import ModelStore
+
+
+def timed(func, histories):
+    start = time.perf_counter()
+    hows = [func(product_name, history) for product_name, history in histories.items()]
+    return time.perf_counter() - start, hows
+
+
+def run_benchmark(n_products, n_months, order=DEFAULT_ORDER):
+    full = synthetic_catalogue(n_products, n_months + 1)
+    previous = {product_name: history[:-1] for product_name, history in full.items()}
+    rows = []
+    seconds, _ = timed(lambda product_name, history: fit_arima(history, order), full)
+    rows.append({'mode': 'full refit', 'seconds': seconds, 'fits': {'cold': n_products}})
+    for mode in ('extend', 'warm'):
+        with tempfile.TemporaryDirectory() as directory:
+            store = ModelStore(directory, max_entries=n_products, mode=mode)
+            timed(lambda product_name, history: store.fit(product_name, history, order), previous)
+            seconds, hows = timed(lambda product_name, history: store.fit(product_name, history, order)[1], full)
+        rows.append({'mode': f"store ({mode})", 'seconds': seconds, 'fits': {how: hows.count(how) for how in set(hows)}})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare a full refit with model-store updates when only the last point of every series is new.")
+    parser.add_argument('--products', type=int, default=100)
+    parser.add_argument('--months', type=int, default=36)
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore')
+    rows = run_benchmark(args.products, args.months)
+    full_seconds = rows[0]['seconds']
+    print(f"{'mode':>15} {'seconds':>9} {'of refit':>9}  fits")
+    for row in rows:
+        print(f"{row['mode']:>15} {row['seconds']:>9.3f} {row['seconds'] / full_seconds:>9.1%}  {row['fits']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+from forecasting import DEFAULT_ORDER
+from parallel import parallel_forecast
+
+
+def synthetic_catalogue(n_products, n_months=24, seed=0):
+    # Monthly series shaped like the GUI examples: a level around 100-300,
+    # a trend, a yearly swing and some noise.
+    rng = np.random.default_rng(seed)
+    months = np.arange(n_months)
+    level = rng.uniform(100, 300, size=(n_products, 1))
+    trend = rng.uniform(-5, 20, size=(n_products, 1))
+    season = rng.uniform(0, 40, size=(n_products, 1)) * np.sin(2 * np.pi * months / 12)
+    noise = rng.normal(0, 10, size=(n_products, n_months))
+    demand = np.round(level + trend * months + season + noise)
+    return {f"product_{i}": demand[i] for i in range(n_products)}
+
+
+def run_benchmark(n_products, max_workers, forecast_steps, orders, chunksize=None):
+    histories = synthetic_catalogue(n_products)
+    rows = []
+    baseline = None
+    for workers in range(1, max_workers + 1):
+        start = time.perf_counter()
+        results = parallel_forecast(histories, orders, forecast_steps, workers=workers, chunksize=chunksize)
+        seconds = time.perf_counter() - start
+        baseline = baseline or seconds
+        rows.append({
+            'workers': workers,
+            'fits': len(results),
+            'failed': sum(result['error'] is not None for result in results),
+            'seconds': seconds,
+            'fits_per_second': len(results) / seconds,
+            'speedup': baseline / seconds,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure parallel ARIMA fitting throughput for 1..N worker processes.")
+    parser.add_argument('--products', type=int, default=200)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--steps', type=int, default=12)
+    parser.add_argument('--chunksize', type=int, default=None)
+    parser.add_argument('--orders', type=int, nargs='+', default=list(DEFAULT_ORDER), help="flattened (p, d, q) triples, e.g. 2 1 1 1 1 1")
+    args = parser.parse_args()
+
+    orders = [tuple(args.orders[i:i + 3]) for i in range(0, len(args.orders), 3)]
+    print(f"{'workers':>8} {'fits':>6} {'failed':>7} {'seconds':>9} {'fits/s':>8} {'speedup':>8}")
+    for row in run_benchmark(args.products, args.max_workers, args.steps, orders, args.chunksize):
+        print(f"{row['workers']:>8} {row['fits']:>6} {row['failed']:>7} {row['seconds']:>9.3f} {row['fits_per_second']:>8.1f} {row['speedup']:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
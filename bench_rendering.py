@@ -0,0 +1,54 @@
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from bench_parallel import synthetic_catalogue
+from rendering import render_charts
+
+
+def chart_jobs(n_products, n_months=24, forecast_steps=12):
+    jobs = []
+    for product_name, values in synthetic_catalogue(n_products, n_months + forecast_steps).items():
+        dates = pd.date_range(start='2022-01-31', periods=len(values), freq='M')
+        history = pd.Series(values[:n_months], index=dates[:n_months])
+        jobs.append((product_name, history, values[n_months:], dates[n_months:]))
+    return jobs
+
+
+def run_benchmark(n_products, max_workers, kinds):
+    jobs = chart_jobs(n_products)
+    rows = []
+    for workers in range(1, max_workers + 1):
+        with tempfile.TemporaryDirectory() as out_dir:
+            for run in ('cold', 'cached'):
+                start = time.perf_counter()
+                charts = render_charts(jobs, out_dir, kinds, workers=workers)
+                seconds = time.perf_counter() - start
+                rows.append({
+                    'workers': workers,
+                    'run': run,
+                    'charts': len(charts),
+                    'rendered': sum(rendered for *_, rendered in charts),
+                    'seconds': seconds,
+                    'charts_per_second': len(charts) / seconds,
+                })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure offscreen chart rendering throughput for 1..N worker processes.")
+    parser.add_argument('--products', type=int, default=100)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--kinds', nargs='+', default=['bar', 'line'])
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'run':>7} {'charts':>7} {'rendered':>9} {'seconds':>8} {'charts/s':>9}")
+    for row in run_benchmark(args.products, args.max_workers, args.kinds):
+        print(f"{row['workers']:>8} {row['run']:>7} {row['charts']:>7} {row['rendered']:>9} {row['seconds']:>8.2f} {row['charts_per_second']:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+import argparse
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+
+from forecasting import DEFAULT_ORDER
+from seasonal import DEFAULT_HARMONICS, DEFAULT_SEASONAL_ORDER, seasonal_forecast
+
+
+def seasonal_series(period, n_cycles, seed=0):
+    # Trend plus a yearly-style bump and noise, n_cycles full seasons long.
+    rng = np.random.default_rng(seed)
+    t = np.arange(period * n_cycles)
+    season = 60 * np.sin(2 * np.pi * t / period) + 25 * np.cos(4 * np.pi * t / period)
+    return 500 + 2 * t + season + rng.normal(0, 10, len(t))
+
+
+def measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def run_benchmark(periods, n_cycles, holdout_cycles, harmonics, max_sarima_period):
+    rows = []
+    for period in periods:
+        series = seasonal_series(period, n_cycles + holdout_cycles)
+        steps = period * holdout_cycles
+        train, actual = series[:-steps], series[-steps:]
+        for method in ('sarima', 'fourier'):
+            if method == 'sarima' and period > max_sarima_period:
+                rows.append({'period': period, 'method': method, 'seconds': None})
+                continue
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                (forecast, _, _), seconds, peak = measure(
+                    lambda: seasonal_forecast(train, DEFAULT_ORDER, steps, period, method, DEFAULT_SEASONAL_ORDER, harmonics)
+                )
+            mape = np.mean(np.abs((actual - forecast) / actual)) * 100
+            rows.append({'period': period, 'method': method, 'seconds': seconds, 'peak_bytes': peak, 'mape': mape})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare fit time, peak memory and holdout accuracy of SARIMA and Fourier-term ARIMA as the seasonal period grows.")
+    parser.add_argument('--periods', type=int, nargs='+', default=[4, 7, 12, 24, 52])
+    parser.add_argument('--cycles', type=int, default=4, help="seasons of training data per series")
+    parser.add_argument('--holdout', type=int, default=1, help="seasons held out and forecast")
+    parser.add_argument('--harmonics', type=int, default=DEFAULT_HARMONICS)
+    parser.add_argument('--max-sarima-period', type=int, default=52, help="skip SARIMA above this period, where a single fit can take minutes")
+    args = parser.parse_args()
+
+    print(f"{'period':>7} {'method':>8} {'seconds':>9} {'peak MB':>9} {'MAPE %':>8}")
+    for row in run_benchmark(args.periods, args.cycles, args.holdout, args.harmonics, args.max_sarima_period):
+        if row['seconds'] is None:
+            print(f"{row['period']:>7} {row['method']:>8} {'skipped':>9}")
+            continue
+        print(f"{row['period']:>7} {row['method']:>8} {row['seconds']:>9.3f} {row['peak_bytes'] / 1e6:>9.1f} {row['mape']:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
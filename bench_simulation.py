@@ -0,0 +1,58 @@
+import argparse
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+
+from bench_parallel import synthetic_catalogue
+from forecasting import DEFAULT_ORDER, fit_arima
+from simulation import DEFAULT_QUANTILES, analytic_fan, product_rng, simulate_paths, streamed_fan
+
+
+def measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def run_benchmark(n_paths, steps, shocks):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        model_fit = fit_arima(synthetic_catalogue(1, 36)['product_0'], DEFAULT_ORDER)
+    quantiles = np.asarray(DEFAULT_QUANTILES)
+    methods = {
+        'analytic': lambda: analytic_fan(model_fit, steps, quantiles),
+        'materialised': lambda: np.quantile(simulate_paths(model_fit, steps, n_paths, product_rng('bench'), shocks), quantiles, axis=0),
+        'streamed': lambda: streamed_fan(model_fit, steps, quantiles, n_paths, product_rng('bench'), shocks),
+    }
+    rows = []
+    reference = None
+    for name, func in methods.items():
+        fan, seconds, peak = measure(func)
+        if name == 'materialised':
+            reference = fan
+        rows.append({'method': name, 'seconds': seconds, 'peak_bytes': peak, 'fan': fan})
+    for row in rows:
+        row['max_diff'] = np.max(np.abs(row['fan'] - reference))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare time and peak memory of analytic, materialised and streamed quantile fans.")
+    parser.add_argument('--paths', type=int, default=200000)
+    parser.add_argument('--steps', type=int, default=12)
+    parser.add_argument('--shocks', choices=('gaussian', 'bootstrap'), default='gaussian')
+    args = parser.parse_args()
+
+    print(f"{'method':>13} {'seconds':>9} {'peak MB':>9} {'max diff':>9}")
+    for row in run_benchmark(args.paths, args.steps, args.shocks):
+        print(f"{row['method']:>13} {row['seconds']:>9.3f} {row['peak_bytes'] / 1e6:>9.1f} {row['max_diff']:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
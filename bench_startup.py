@@ -0,0 +1,65 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ENTRY_POINTS = ('main', 'line', 'demand')
+# Modules that must not be imported before the first window is shown.
+HEAVY_MODULES = ('pandas', 'matplotlib', 'statsmodels', 'pymongo', 'scipy')
+
+
+def import_times(module):
+    # Runs `python -X importtime -c "import <module>"` in a fresh interpreter
+    # and returns {module: (self_us, cumulative_us)} for everything it
+    # imported, plus the cumulative time of the module itself.
+    env = dict(os.environ, MPLBACKEND='Agg')
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"], capture_output=True, text=True, env=env, check=True).stderr
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times, times[module][1]
+
+
+def wall_time(module, repeats):
+    env = dict(os.environ, MPLBACKEND='Agg')
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', f"import {module}"], check=True, env=env)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time of the GUI entry points with -X importtime, optionally failing above a budget.")
+    parser.add_argument('modules', nargs='*', default=list(ENTRY_POINTS))
+    parser.add_argument('--top', type=int, default=5, help="slowest imported modules to list per entry point")
+    parser.add_argument('--repeats', type=int, default=3, help="interpreter launches timed per entry point (best is reported)")
+    parser.add_argument('--max-ms', type=float, default=None, help="fail if an entry point's import takes longer than this")
+    parser.add_argument('--forbid', nargs='*', default=list(HEAVY_MODULES), help="fail if an entry point imports any of these at startup")
+    args = parser.parse_args()
+
+    failures = []
+    for module in args.modules:
+        times, cumulative_us = import_times(module)
+        wall = wall_time(module, args.repeats)
+        print(f"{module}: import {cumulative_us / 1000:.1f} ms, interpreter start + import {wall * 1000:.1f} ms, {len(times)} modules")
+        for name, (self_us, _) in sorted(times.items(), key=lambda item: -item[1][0])[:args.top]:
+            print(f"    {self_us / 1000:>8.1f} ms  {name}")
+        heavy = sorted({name.split('.')[0] for name in times} & set(args.forbid))
+        if heavy:
+            failures.append(f"{module} imports {', '.join(heavy)} at startup")
+        if args.max_ms is not None and cumulative_us / 1000 > args.max_ms:
+            failures.append(f"{module} takes {cumulative_us / 1000:.1f} ms to import (budget {args.max_ms:.0f} ms)")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
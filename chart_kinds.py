@@ -0,0 +1,3 @@
+# Chart kinds rendering.py can draw. Kept apart from rendering.py so the
+# batch CLI can offer them without importing matplotlib.
+CHART_KINDS = ('bar', 'line')
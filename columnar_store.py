@@ -0,0 +1,223 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+# Columns of a stored run and their on-disk dtypes. Each is one flat binary
+# file with the values of every product back to back.
+COLUMNS = {'date': 'datetime64[ns]', 'forecast': 'float64', 'lower': 'float64', 'upper': 'float64'}
+MANIFEST = 'manifest.jsonl'
+
+
+class RunWriter:
+    # Streams the forecasts of one run into a hidden directory, batch by
+    # batch, and publishes it on close(): the directory is renamed into
+    # place and the run appended to the manifest. Earlier runs are never
+    # touched, and a run that fails half way is never visible to readers.
+
+    def __init__(self, store, run_id=None, **meta):
+        self.store = store
+        self.run_id = run_id or uuid.uuid4().hex
+        self.meta = meta
+        self.tmp_dir = os.path.join(store.directory, 'runs', f".{self.run_id}.tmp")
+        os.makedirs(self.tmp_dir)
+        self.files = {name: open(os.path.join(self.tmp_dir, f"{name}.bin"), 'wb') for name in COLUMNS}
+        self.products = []
+        self.offsets = [0]
+        self.closed = False
+
+    def write(self, frame):
+        # frame has batch_forecast's columns, one block of rows per product.
+        if not len(frame):
+            return
+        names = frame['product_name'].to_numpy()
+        starts = np.flatnonzero(np.r_[True, names[1:] != names[:-1]])
+        lengths = np.diff(np.r_[starts, len(names)])
+        for name, dtype in COLUMNS.items():
+            self.files[name].write(np.ascontiguousarray(frame[name].to_numpy(dtype=dtype)).tobytes())
+        self.products.extend(str(name) for name in names[starts])
+        self.offsets.extend(self.offsets[-1] + np.cumsum(lengths))
+
+    def close(self):
+        if self.closed:
+            return self.run_id
+        for f in self.files.values():
+            f.close()
+        np.save(os.path.join(self.tmp_dir, 'offsets.npy'), np.asarray(self.offsets, dtype=np.int64))
+        with open(os.path.join(self.tmp_dir, 'products.json'), 'w') as f:
+            json.dump(self.products, f)
+        os.replace(self.tmp_dir, self.store.run_dir(self.run_id))
+        self.store.append_manifest({
+            'run_id': self.run_id,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'n_products': len(self.products),
+            'n_values': int(self.offsets[-1]),
+            **self.meta,
+        })
+        self.closed = True
+        return self.run_id
+
+    def abort(self):
+        if self.closed:
+            return
+        for f in self.files.values():
+            f.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        self.closed = True
+
+
+class StoredRun:
+    # Read-only view of one run. Columns are memory-mapped, so product()
+    # and catalogue() return views into the page cache rather than copies.
+
+    def __init__(self, directory, entry):
+        self.directory = directory
+        self.entry = entry
+        self.run_id = entry['run_id']
+        self.offsets = np.load(os.path.join(directory, 'offsets.npy'), mmap_mode='r')
+        with open(os.path.join(directory, 'products.json')) as f:
+            self.products = json.load(f)
+        self.position = {product_name: i for i, product_name in enumerate(self.products)}
+        self.columns = {}
+        for name, dtype in COLUMNS.items():
+            if entry['n_values']:
+                self.columns[name] = np.memmap(os.path.join(directory, f"{name}.bin"), dtype=dtype, mode='r', shape=(entry['n_values'],))
+            else:
+                self.columns[name] = np.empty(0, dtype=dtype)
+
+    def __contains__(self, product_name):
+        return product_name in self.position
+
+    def product(self, product_name):
+        # {column: array} of one product's forecast horizon.
+        i = self.position[product_name]
+        start, stop = self.offsets[i], self.offsets[i + 1]
+        return {name: column[start:stop] for name, column in self.columns.items()}
+
+    def catalogue(self):
+        # Every product's values back to back; product i spans
+        # offsets[i]:offsets[i + 1].
+        return self.columns
+
+    def frame(self, product_names=None):
+        product_names = self.products if product_names is None else product_names
+        frames = []
+        for product_name in product_names:
+            frame = pd.DataFrame(self.product(product_name))
+            frame.insert(0, 'step', np.arange(1, len(frame) + 1))
+            frame.insert(0, 'product_name', product_name)
+            frames.append(frame)
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['product_name', 'step', *COLUMNS])
+
+
+class ColumnarStore:
+    # Forecast runs on local disk, one directory of column files per run and
+    # an append-only manifest listing the published runs in order.
+
+    def __init__(self, directory):
+        os.makedirs(os.path.join(directory, 'runs'), exist_ok=True)
+        self.directory = directory
+        self.opened = {}
+
+    def run_dir(self, run_id):
+        return os.path.join(self.directory, 'runs', run_id)
+
+    def append_manifest(self, entry):
+        with open(os.path.join(self.directory, MANIFEST), 'a') as f:
+            f.write(json.dumps(entry, default=str) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def runs(self):
+        # Published runs, oldest first. A line torn by a crash mid-append is
+        # skipped; its run directory was complete but is simply not listed.
+        entries = []
+        try:
+            with open(os.path.join(self.directory, MANIFEST)) as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        pass
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def writer(self, run_id=None, **meta):
+        return RunWriter(self, run_id, **meta)
+
+    def append_run(self, forecasts, run_id=None, **meta):
+        writer = self.writer(run_id, **meta)
+        try:
+            writer.write(forecasts)
+            return writer.close()
+        finally:
+            writer.abort()
+
+    def open_run(self, run_id=None):
+        # The latest run unless run_id is given.
+        entries = {entry['run_id']: entry for entry in self.runs()}
+        if not entries:
+            raise KeyError("the store has no runs yet")
+        run_id = run_id or list(entries)[-1]
+        if run_id not in self.opened:
+            self.opened[run_id] = StoredRun(self.run_dir(run_id), entries[run_id])
+        return self.opened[run_id]
+
+    def latest_runs(self):
+        # {product: run} with the newest run that forecast each product, for
+        # stores where runs cover different parts of the catalogue.
+        latest = {}
+        for entry in reversed(self.runs()):
+            run = self.open_run(entry['run_id'])
+            for product_name in run.products:
+                latest.setdefault(product_name, run)
+        return latest
+
+    def latest(self, product_name):
+        for entry in reversed(self.runs()):
+            run = self.open_run(entry['run_id'])
+            if product_name in run:
+                return run.product(product_name)
+        raise KeyError(product_name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List the runs in a columnar forecast store or export forecasts from it.")
+    parser.add_argument('store', help="store directory written by batch_forecast.py --store")
+    parser.add_argument('--run', default=None, help="run to read (default: the newest forecast of each product)")
+    parser.add_argument('--product', nargs='+', default=None, help="products to export (default: all)")
+    parser.add_argument('--output', default=None, help="CSV file to export to; without it the runs are listed")
+    args = parser.parse_args(argv)
+
+    store = ColumnarStore(args.store)
+    if not args.output:
+        for entry in store.runs():
+            print(f"{entry['run_id']}  {entry['created']}  {entry['n_products']} products")
+        return 0
+    try:
+        if args.run:
+            frame = store.open_run(args.run).frame(args.product)
+        else:
+            latest = store.latest_runs()
+            frames = []
+            for product_name in args.product or latest:
+                run = latest[product_name]
+                frames.append(run.frame([product_name]).assign(run_id=run.run_id))
+            frame = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    except KeyError as e:
+        print(f"Error occurred: {e} not found in {args.store}", file=sys.stderr)
+        return 1
+    frame.to_csv(args.output, index=False)
+    print(f"Wrote {len(frame)} rows into {args.output}.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,119 +1,106 @@
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
-from statsmodels.tsa.arima.model import ARIMA
 import customtkinter
-import pymongo
-
-# Define ARIMA model function
-def arima_model(train_data, order, forecast_steps):
-    history = [x for x in train_data]
-    predictions = []
-    for _ in range(forecast_steps):
-        try:
-            model = ARIMA(history, order=order)
-            model_fit = model.fit()
-            yhat = model_fit.forecast()[0]
-            predictions.append(yhat)
-            history.append(yhat)
-        except Exception as e:
-            print(f"Error occurred: {e}")
-    return predictions
-
-# Define function to update plot
-def update_height_color(frame):
-    ax.clear()
-    ax.bar(df.index, df['demand'], label='Actual Demand', align='center', width=10)
-    forecast_dates = df.index[-1] + pd.DateOffset(months=1) * np.arange(1, frame + 1)
-    december_demand = df[df.index.month == 12]['demand'].values[0]
-    for i in range(frame):
-        if predictions_with_noise[i] < december_demand:
-            color = 'red'
-        else:
-            color = 'green'
-        ax.bar(forecast_dates[i], predictions_with_noise[i], label='Forecasted Demand', align='center', width=10, color=color, alpha=0.4)
-        ax.text(forecast_dates[i], predictions_with_noise[i], f"{forecast_dates[i].strftime('%b')[:3]}", ha='center', va='bottom')
-    ax.set_xticks(df.index.union(forecast_dates))
-    ax.set_xticklabels([date.strftime('%b') for date in df.index.union(forecast_dates)])
-    ax.set_title('Demand Forecasting with ARIMA')
-    ax.set_xlabel('Date')
-    ax.set_ylabel('Demand')
-    ax.legend()
-    return ax,
+import instrumentation
+from gui_worker import ForecastJob, checkpoint, stage_progress
+from lazy import GUI_PRELOAD, lazy_import, preload
+
+# Heavy modules are imported on first use, or by the preload started once the window
+# is up, so it appears without waiting for pandas, matplotlib, statsmodels or pymongo
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+plt = lazy_import('matplotlib.pyplot')
+ingestion = lazy_import('ingestion')
+bar_animation = lazy_import('bar_animation')
+rendering = lazy_import('rendering')
+simulation = lazy_import('simulation')
+persistence = lazy_import('persistence')
+forecast_codec = lazy_import('forecast_codec')
+demand_model = lazy_import('demand_model')
+
+# Define ARIMAX model function: demand is the target, marketing cost and price feed the model as exogenous drivers
+def arimax_model(demand, marketing_cost, price, order, forecast_steps, progress=None):
+    # Errors propagate to the worker, which shows them in the status label,
+    # instead of returning a shortened (empty) prediction list
+    forecast = demand_model.arimax_forecast(demand, marketing_cost, price, forecast_steps, order=order)
+    if progress:
+        progress(1, 1)
+    return forecast
 
 # Connect to MongoDB and define function to store demand forecast data
-def store_demand_forecast_data(demand, forecast_steps, sales, marketing_cost, price, graph_data_path):
+def store_demand_forecast_data(history, forecast, lower, upper, forecast_steps, sales, marketing_cost, price, graph_data_path):
     try:
-        # Connect to MongoDB
-        client = pymongo.MongoClient("mongodb://127.0.0.1:27017")
-        db = client['Demand']
-        collection = db['demand_forecasting']
-
-        # Store demand, forecast steps, and other data
-        document = {
-            'demand': demand,
-            'forecast_steps': forecast_steps,
-            'sales_data': sales,
-            'marketing_cost': marketing_cost,
-            'price': price,
-            'graph_data': graph_data_path  # Assuming you save the plot as an image file
-        }
-        collection.insert_one(document)
+        # Get the shared, pooled MongoDB collection
+        collection = persistence.get_collection('Demand')
+
+        # Store history, forecast and intervals as compact float32 arrays, plus forecast steps and other data
+        document = forecast_codec.encode_forecast_document(None, history, forecast, lower, upper, start=history.index[0], freq='M',
+                                                           forecast_steps=forecast_steps,
+                                                           sales_data=sales,
+                                                           marketing_cost=marketing_cost,
+                                                           price=price,
+                                                           graph_data=graph_data_path)  # Assuming you save the plot as an image file
+        with persistence.ForecastWriter(collection) as writer:
+            writer.add(document)
         print("Data stored successfully in MongoDB.")
     except Exception as e:
+        instrumentation.count('store_failed')
         print(f"Error occurred while storing data in MongoDB: {e}")
 
-# Define function to start demand forecasting process
-def start_forecasting(sales, marketing_cost, price, forecast_steps, screen_width, screen_height):
-    app.withdraw()  # Hide the main window
-
-    # Generate date range
-    dates = pd.date_range(start='2023-01-01', end='2023-12-31', freq='M')
-
-    # Generate demand using the provided formula
-    demand = 0.6 * sales + 0.4 * marketing_cost - 0.3 * price
+# Define function to run the forecast (called on the background worker thread, so no Tk or plotting here)
+# Each call records per-stage timings, reported to FORECAST_REPORT_DIR when set
+@instrumentation.reported('demand')
+def run_forecast(sales, marketing_cost, price, forecast_steps, progress=None):
+    # Generate demand using the provided formula (vectorized, works on plain lists)
+    demand = demand_model.derive_demand(sales, marketing_cost, price)
+    dates = ingestion.history_index(len(demand))
 
     # Sample data
     data = {'date': dates, 'demand': demand}
 
     # Create DataFrame
-    global df
-    df = pd.DataFrame(data)
-    df.set_index('date', inplace=True)
+    with instrumentation.stage('dataframe'):
+        history = pd.DataFrame(data)
+        history.set_index('date', inplace=True)
 
-    # Forecast for the specified number of steps
+    # Forecast for the specified number of steps, holding the drivers at their last values
     order = (2, 1, 1)  # ARIMA order (p, d, q)
-    global predictions_with_noise
-    predictions = arima_model(df['demand'], order, forecast_steps)
-
-    # Generate random noise with the same length as predictions
-    np.random.seed(0)  # for reproducibility
-    noise = np.random.normal(loc=0, scale=10, size=len(predictions))
-
-    # Add noise to the predictions
-    predictions_with_noise = predictions + noise
+    checkpoint(progress, 0, 3)  # fit, chart and store each fill a third of the progress bar
+    predictions, lower, upper = arimax_model(history['demand'], marketing_cost, price, order, forecast_steps, stage_progress(progress, 0, 3))
+
+    # Generate random noise with the same length as predictions and add it to the predictions
+    with instrumentation.stage('noise'):
+        noise = simulation.forecast_noise('demand', len(predictions), scale=10)  # reproducible, without touching global state
+        noisy_predictions = predictions + noise
+
+    # Save the final bar chart offscreen under a name derived from its data (a pending cancel stops here)
+    checkpoint(progress, 1, 3)
+    forecast_dates = history.index[-1] + pd.DateOffset(months=1) * np.arange(1, len(noisy_predictions) + 1)
+    graph_data_path, rendered = rendering.render_chart('bar', 'demand', history['demand'], noisy_predictions, forecast_dates)
+
+    # Store data in MongoDB, unless cancelled while the chart was drawn
+    checkpoint(progress, 2, 3)
+    store_demand_forecast_data(history['demand'], predictions, lower, upper, forecast_steps, sales, marketing_cost, price, graph_data_path)
+    return history, noisy_predictions
+
+# Define function to show a finished forecast (called on the Tk thread)
+def show_forecast(result):
+    app.withdraw()  # Hide the main window
+    global df, predictions_with_noise
+    df, predictions_with_noise = result
 
     # Create a figure and axis
-    global fig, ax
+    global fig, ax, bar_anim
     fig, ax = plt.subplots(figsize=(10, 6))
 
-    # Create animation
-    ani = FuncAnimation(fig, update_height_color, frames=forecast_steps + 1, blit=True, repeat=False)
-
-    # Set x label and y label
-    ax.set_xlabel('Date')
-    ax.set_ylabel('Demand')
+    # Create the bars once and reveal one forecast per frame (blitted)
+    forecast_dates = df.index[-1] + pd.DateOffset(months=1) * np.arange(1, len(predictions_with_noise) + 1)
+    bar_anim = bar_animation.ForecastBarAnimation(ax, df['demand'], predictions_with_noise, forecast_dates)
+    bar_anim.start()
 
     plt.show()
 
-    # Store data in MongoDB
-    store_demand_forecast_data(demand, forecast_steps, sales, marketing_cost, price, graph_data_path)  # Replace with the actual path to the graph image
-
-# Create the main application window
-app = customtkinter.CTk()
-app.title("DemandWise")
-customtkinter.set_appearance_mode("dark")
+# Define function to start demand forecasting process
+def start_forecasting(sales, marketing_cost, price, forecast_steps, screen_width, screen_height):
+    show_forecast(run_forecast(sales, marketing_cost, price, forecast_steps))
 
 # Define function to adjust window size and create widgets
 def adjust_window():
@@ -169,23 +156,75 @@ def start_forecasting_page(screen_width, screen_height):
     # Define function to start forecasting on the page
     def start_forecasting_on_page():
         sales_str = sales_entry.get()
-        sales = list(map(int, sales_str.split(',')))
         marketing_cost_str = marketing_cost_entry.get()
-        marketing_cost = list(map(int, marketing_cost_str.split(',')))
-        price = int(price_entry.get())
-        forecast_steps = int(forecast_steps_entry.get())
+        try:
+            sales = ingestion.parse_demand(sales_str)
+            marketing_cost = ingestion.parse_demand(marketing_cost_str)
+            price = float(price_entry.get())
+            forecast_steps = int(forecast_steps_entry.get())
+        except ValueError as e:
+            status_label.configure(text=f"Invalid input: {e}")
+            return
+        if len(sales) != len(marketing_cost):
+            status_label.configure(text="Invalid input: sales and marketing cost need one value per month each")
+            return
+
+        # Start forecasting on the worker thread, or queue it behind the running forecast
+        if forecast_job.submit(run_forecast, sales, marketing_cost, price, forecast_steps):
+            progress_bar.set(0)
+            status_label.configure(text="Forecasting...")
+        else:
+            status_label.configure(text="Queued: starts when the current forecast finishes.")
+
+    # Define callbacks the worker delivers on the Tk thread
+    def update_progress(done, total):
+        progress_bar.set(done / total)
+
+    def forecast_done(result):
+        progress_bar.set(1)
+        status_label.configure(text="")
+        show_forecast(result)
 
-        # Start forecasting
-        start_forecasting(sales, marketing_cost, price, forecast_steps, screen_width, screen_height)
+    def forecast_failed(e):
+        progress_bar.set(0)
+        status_label.configure(text=f"Error occurred: {e}")
+
+    def forecast_cancelled():
+        progress_bar.set(0)
+        status_label.configure(text="Forecast cancelled.")
+
+    forecast_job = ForecastJob(root, forecast_done, on_progress=update_progress, on_error=forecast_failed, on_cancel=forecast_cancelled)
+
+    def cancel_forecast():
+        if forecast_job.cancel():
+            status_label.configure(text="Cancelling: a model fit already running has to finish first.")
 
     # Create button to start forecasting
     b1 = customtkinter.CTkButton(root, text="Start Forecasting", width=0.09 * root_width, height=0.05 * root_height, corner_radius=50, command=start_forecasting_on_page)
     b1.pack(pady=(20, 0))  # Add vertical padding between the widget and the one above it
 
+    # Create button to cancel the running forecast, a progress bar and a status line
+    b2 = customtkinter.CTkButton(root, text="Cancel", width=0.09 * root_width, height=0.05 * root_height, corner_radius=50, command=cancel_forecast)
+    b2.pack(pady=(10, 0))  # Add vertical padding between the widget and the one above it
+    progress_bar = customtkinter.CTkProgressBar(root, width=int(0.4 * screen_height))
+    progress_bar.set(0)
+    progress_bar.pack(pady=(10, 0))  # Add vertical padding between the widget and the one above it
+    status_label = customtkinter.CTkLabel(root, text="", text_color="#faf9f9")
+    status_label.pack(pady=(5, 0))  # Add vertical padding between the widget and the one above it
+
     root.mainloop()
 
-# Adjust the window size and create the label widget
-adjust_window()
+if __name__ == '__main__':
+    # Create the main application window
+    app = customtkinter.CTk()
+    app.title("DemandWise")
+    customtkinter.set_appearance_mode("dark")
+
+    # Adjust the window size and create the label widget
+    adjust_window()
+
+    # Warm up the forecasting modules in the background once the window has been drawn
+    app.after(100, preload, GUI_PRELOAD + ('demand_model',))
 
-# Run the application
-app.mainloop()
+    # Run the application
+    app.mainloop()
@@ -0,0 +1,69 @@
+import warnings
+
+import numpy as np
+
+from forecasting import DEFAULT_ORDER, fit_arima, forecast_from_fit
+from parallel import parallel_map
+
+DEMAND_COEFFICIENTS = {'sales': 0.6, 'marketing_cost': 0.4, 'price': -0.3}
+
+
+def derive_demand(sales, marketing_cost, price, coefficients=DEMAND_COEFFICIENTS):
+    # Works on whole (products x months) arrays at once. Inputs broadcast
+    # against each other, so price can be a scalar, one value per month, or a
+    # (products x 1) column of per-product prices.
+    sales = np.asarray(sales, dtype=float)
+    marketing_cost = np.asarray(marketing_cost, dtype=float)
+    price = np.asarray(price, dtype=float)
+    return coefficients['sales'] * sales + coefficients['marketing_cost'] * marketing_cost + coefficients['price'] * price
+
+
+def driver_matrix(marketing_cost, price, shape):
+    # Stacks the drivers into a (products x months x 2) exog array.
+    return np.stack([np.broadcast_to(np.asarray(marketing_cost, dtype=float), shape), np.broadcast_to(np.asarray(price, dtype=float), shape)], axis=-1)
+
+
+def future_drivers(exog, forecast_steps, future_marketing_cost=None, future_price=None):
+    # Future drivers default to their last observed values.
+    if future_marketing_cost is None:
+        future_marketing_cost = exog[:, -1:, 0]
+    if future_price is None:
+        future_price = exog[:, -1:, 1]
+    return driver_matrix(future_marketing_cost, future_price, (exog.shape[0], forecast_steps))
+
+
+def arimax_forecast(demand, marketing_cost, price, forecast_steps, future_marketing_cost=None, future_price=None, order=DEFAULT_ORDER, alpha=0.05):
+    # One product: demand as the target, marketing cost and price as
+    # exogenous regressors. Raises if the fit fails.
+    demand = np.asarray(demand, dtype=float)
+    exog = driver_matrix(marketing_cost, price, (1, len(demand)))
+    future_exog = future_drivers(exog, forecast_steps, future_marketing_cost, future_price)
+    model_fit = fit_arima(demand, order, exog=exog[0])
+    return forecast_from_fit(model_fit, forecast_steps, alpha, exog=future_exog[0])
+
+
+def arimax_task(task):
+    endog, exog, future_exog, order, forecast_steps, alpha = task
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        try:
+            model_fit = fit_arima(endog, order, exog=exog)
+            return forecast_from_fit(model_fit, forecast_steps, alpha, exog=future_exog)
+        except Exception:
+            missing = np.full(forecast_steps, np.nan)
+            return missing, missing, missing
+
+
+def arimax_forecast_batch(demand, marketing_cost, price, forecast_steps, future_marketing_cost=None, future_price=None, order=DEFAULT_ORDER, alpha=0.05, workers=1):
+    # Fits one ARIMAX per product with demand (e.g. from derive_demand) as
+    # the target and marketing cost and price as exogenous regressors.
+    # Returns (forecast, lower, upper) arrays of shape (products x
+    # forecast_steps); products whose fit fails are NaN rows.
+    demand = np.atleast_2d(np.asarray(demand, dtype=float))
+    n_products, n_months = demand.shape
+    exog = driver_matrix(marketing_cost, price, demand.shape)
+    future_exog = future_drivers(exog, forecast_steps, future_marketing_cost, future_price)
+    tasks = [(demand[i], exog[i], future_exog[i], order, forecast_steps, alpha) for i in range(n_products)]
+    results = parallel_map(arimax_task, tasks, workers)
+    forecast, lower, upper = (np.array([result[k] for result in results]).reshape(n_products, forecast_steps) for k in range(3))
+    return forecast, lower, upper
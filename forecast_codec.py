@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+FORMAT_VERSION = 1
+DTYPE = np.dtype('<f4')
+ARRAY_FIELDS = ('history', 'forecast', 'lower', 'upper')
+
+
+def pack(values):
+    return np.ascontiguousarray(values, dtype=DTYPE).tobytes()
+
+
+def unpack(data):
+    return np.frombuffer(data, dtype=DTYPE)
+
+
+def encode_forecast_document(product_name, history, forecast, lower, upper, start, freq='M', **fields):
+    # Arrays are stored as little-endian float32 bytes (BSON binary) and the
+    # dates as the first history period plus a pandas frequency alias, so a
+    # document never holds one BSON value per data point.
+    document = {
+        'product_name': product_name,
+        'format': FORMAT_VERSION,
+        'start': pd.Timestamp(start).to_pydatetime(),
+        'freq': freq,
+        'n_history': len(history),
+        'n_forecast': len(forecast),
+    }
+    for field, values in zip(ARRAY_FIELDS, (history, forecast, lower, upper)):
+        document[field] = pack(values)
+    document.update(fields)
+    return document
+
+
+def decode_forecast_document(document):
+    decoded = dict(document)
+    for field in ARRAY_FIELDS:
+        decoded[field] = unpack(document[field])
+    index = pd.date_range(start=document['start'], periods=document['n_history'] + document['n_forecast'], freq=document['freq'])
+    decoded['history_dates'] = index[:document['n_history']]
+    decoded['forecast_dates'] = index[document['n_history']:]
+    return decoded
+
+
+def stack_field(documents, field='forecast'):
+    # Joins the raw bytes of every document and decodes them with a single
+    # frombuffer call. Rows shorter than the longest one are padded with NaN.
+    # Missing or list-format fields give an all-NaN row.
+    chunks = [bytes(value) if isinstance(value := document.get(field), (bytes, bytearray)) else b'' for document in documents]
+    lengths = np.fromiter((len(chunk) for chunk in chunks), dtype=np.int64, count=len(chunks)) // DTYPE.itemsize
+    flat = np.frombuffer(b''.join(chunks), dtype=DTYPE)
+    width = int(lengths.max()) if len(lengths) else 0
+    if np.all(lengths == width):
+        return flat.reshape(len(chunks), width)
+    block = np.full((len(chunks), width), np.nan, dtype=DTYPE)
+    rows = np.repeat(np.arange(len(chunks)), lengths)
+    cols = np.arange(len(flat)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    block[rows, cols] = flat
+    return block
+
+
+def read_forecast_block(documents, field='forecast'):
+    documents = list(documents)
+    products = [document.get('product_name') for document in documents]
+    return products, stack_field(documents, field)
+
+
+def block_start(document, field):
+    # First date of the field's row, or NaT when the document lacks the
+    # fields to tell.
+    if document.get('start') is None:
+        return pd.NaT
+    if field == 'history':
+        return pd.Timestamp(document['start'])
+    if document.get('freq') is None or document.get('n_history') is None:
+        return pd.NaT
+    return pd.Timestamp(document['start']) + pd.tseries.frequencies.to_offset(document['freq']) * document['n_history']
+
+
+def load_forecast_block(collection, query=None, field='forecast'):
+    # Only documents in the binary format are loaded unless the query asks
+    # for something else; list-format documents written before it have none
+    # of the binary fields. Missing product names, fields and dates come back
+    # as None, NaN rows and NaT.
+    query = {'format': FORMAT_VERSION, **(query or {})}
+    projection = {'_id': 0, 'product_name': 1, 'start': 1, 'freq': 1, 'n_history': 1, field: 1}
+    documents = list(collection.find(query, projection))
+    products, block = read_forecast_block(documents, field)
+    starts = [block_start(document, field) for document in documents]
+    return pd.DataFrame(block, index=pd.Index(products, name='product_name')), pd.DatetimeIndex(starts)
@@ -0,0 +1,58 @@
+import hashlib
+
+import numpy as np
+from statsmodels.tsa.arima.model import ARIMA
+
+import instrumentation
+
+DEFAULT_ORDER = (2, 1, 1)
+
+
+def series_hash(values):
+    return hashlib.sha1(np.ascontiguousarray(values, dtype=np.float64).tobytes()).hexdigest()
+
+
+def fit_arima(history, order, exog=None, seasonal_order=(0, 0, 0, 0), start_params=None):
+    instrumentation.count('fits_attempted')
+    with instrumentation.stage('fit'):
+        try:
+            model_fit = ARIMA(np.asarray(history, dtype=float), exog=exog, order=order, seasonal_order=seasonal_order).fit(start_params=start_params)
+        except Exception:
+            instrumentation.count('fits_failed')
+            raise
+    # The same condition statsmodels raises its ConvergenceWarning for, read
+    # from the fit so callers can keep filtering the warning itself.
+    if not model_fit.mle_retvals.get('converged', True):
+        instrumentation.count('convergence_warnings')
+    return model_fit
+
+
+def forecast_from_fit(model_fit, forecast_steps, alpha=0.05, exog=None):
+    forecast = model_fit.get_forecast(steps=forecast_steps, exog=exog)
+    conf_int = np.asarray(forecast.conf_int(alpha=alpha))
+    return np.asarray(forecast.predicted_mean), conf_int[:, 0], conf_int[:, 1]
+
+
+def arima_forecast(train_data, order, forecast_steps, refit=False, alpha=0.05, progress=None):
+    # progress, if given, is called as progress(fits_done, fits_total) after
+    # every fit; raising from it aborts the forecast.
+    history = np.asarray(train_data, dtype=float)
+    if not refit:
+        model_fit = fit_arima(history, order)
+        if progress:
+            progress(1, 1)
+        return forecast_from_fit(model_fit, forecast_steps, alpha)
+
+    # Recursive mode: refit on the history extended with each new forecast,
+    # matching the behaviour of the original per-step loop.
+    predictions = np.empty(forecast_steps)
+    lower = np.empty(forecast_steps)
+    upper = np.empty(forecast_steps)
+    history = list(history)
+    for i in range(forecast_steps):
+        yhat, low, high = forecast_from_fit(fit_arima(history, order), 1, alpha)
+        predictions[i], lower[i], upper[i] = yhat[0], low[0], high[0]
+        history.append(yhat[0])
+        if progress:
+            progress(i + 1, forecast_steps)
+    return predictions, lower, upper
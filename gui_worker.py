@@ -0,0 +1,109 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ForecastCancelled(Exception):
+    pass
+
+
+def checkpoint(progress, done, total):
+    # Reports progress between stages of a job; through ForecastJob.report
+    # this is also where a cancel request takes effect. A model fit that has
+    # started cannot be interrupted, so cancelling waits for it to finish.
+    if progress:
+        progress(done, total)
+
+
+def stage_progress(progress, stage, n_stages):
+    # Maps one stage's own progress(done, total) onto its share of the job's.
+    if progress is None:
+        return None
+    return lambda done, total: progress(stage + done / total, n_stages)
+
+
+class ForecastJob:
+    # Runs forecasting work on a single background thread and hands progress
+    # and results back to the Tk thread by polling a queue with widget.after(),
+    # since Tk widgets must only be touched from the thread running mainloop.
+    # While a job is running, new requests are coalesced: only the most
+    # recent one is kept and it starts as soon as the running job finishes.
+
+    def __init__(self, widget, on_done, on_progress=None, on_error=None, on_cancel=None, poll_ms=100):
+        self.widget = widget
+        self.on_done = on_done
+        self.on_progress = on_progress
+        self.on_error = on_error
+        self.on_cancel = on_cancel
+        self.poll_ms = poll_ms
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='forecast')
+        self.events = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.future = None
+        self.pending = None
+        self.busy = False
+
+    def running(self):
+        return self.future is not None and not self.future.done()
+
+    def submit(self, func, *args):
+        # func is called as func(*args, progress=...) on the worker thread.
+        # busy stays set until poll() has delivered the result, so a request
+        # made between the worker finishing and the next poll still waits.
+        if self.busy:
+            self.pending = (func, args)
+            return False
+        self.busy = True
+        self.cancel_event.clear()
+        self.future = self.executor.submit(func, *args, progress=self.report)
+        self.widget.after(self.poll_ms, self.poll)
+        return True
+
+    def report(self, done, total):
+        # Called from the worker; raising here is how a cancel request stops
+        # the fit loop between steps.
+        if self.cancel_event.is_set():
+            raise ForecastCancelled()
+        self.events.put((done, total))
+
+    def cancel(self):
+        # Returns True if a running job was asked to stop; it stops at its
+        # next checkpoint.
+        self.pending = None
+        self.cancel_event.set()
+        return self.running()
+
+    def poll(self):
+        while True:
+            try:
+                done, total = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if self.on_progress:
+                self.on_progress(done, total)
+        if self.running():
+            self.widget.after(self.poll_ms, self.poll)
+            return
+
+        try:
+            result = self.future.result()
+        except ForecastCancelled:
+            if self.on_cancel:
+                self.on_cancel()
+        except Exception as e:
+            if self.on_error:
+                self.on_error(e)
+            else:
+                print(f"Error occurred: {e}")
+        else:
+            self.on_done(result)
+
+        self.busy = False
+        if self.pending:
+            func, args = self.pending
+            self.pending = None
+            self.submit(func, *args)
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False)
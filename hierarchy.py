@@ -0,0 +1,178 @@
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.linalg import spsolve
+from scipy.stats import norm
+
+from baselines import naive
+from forecasting import DEFAULT_ORDER
+from ingestion import DEFAULT_FREQ, forecast_index, load_histories
+from parallel import parallel_forecast
+
+RECONCILERS = ('bottom_up', 'top_down', 'ols', 'mint')
+
+
+def summing_matrix(products, levels):
+    # levels is a list of (level name, {product: group}) pairs, coarsest
+    # first. Rows of S are the total, then the groups of every level, then
+    # the products themselves, so S @ bottom gives every node's value.
+    # Returns S (sparse, nodes x products) and a (level, name) per row.
+    products = list(products)
+    n_products = len(products)
+    columns = np.arange(n_products)
+    blocks = [sp.csr_matrix(np.ones((1, n_products)))]
+    nodes = [('total', 'total')]
+    for level, mapping in levels:
+        groups = pd.Series(products).map(mapping)
+        if groups.isna().any():
+            raise ValueError(f"no {level} given for products {list(groups.index[groups.isna()].map(products.__getitem__)[:5])}")
+        codes, names = pd.factorize(groups)
+        blocks.append(sp.csr_matrix((np.ones(n_products), (codes, columns)), shape=(len(names), n_products)))
+        nodes += [(level, name) for name in names]
+    blocks.append(sp.identity(n_products, format='csr'))
+    nodes += [('product', product_name) for product_name in products]
+    return sp.vstack(blocks, format='csr'), nodes
+
+
+def n_aggregates(S):
+    return S.shape[0] - S.shape[1]
+
+
+def bottom_up(S, forecasts, history=None, weights=None):
+    return S @ forecasts[n_aggregates(S):]
+
+
+def top_down(S, forecasts, history, weights=None):
+    # Splits the total forecast by each product's share of total historical
+    # demand (proportions of the historical averages).
+    bottom_history = history[n_aggregates(S):]
+    shares = bottom_history.sum(axis=1) / bottom_history.sum()
+    return S @ (shares[:, None] * forecasts[0][None, :])
+
+
+def mint(S, forecasts, history=None, weights=None):
+    # Minimum-trace reconciliation with a diagonal covariance W (one
+    # variance per node): y~ = y^ - W U (U'WU)^-1 U'y^, where U'y = 0 are
+    # the aggregation constraints y_agg - C y_bottom = 0. U'WU is only
+    # aggregates x aggregates, so nothing products x products is ever formed.
+    # Without weights this is OLS reconciliation.
+    n_agg = n_aggregates(S)
+    weights = np.ones(S.shape[0]) if weights is None else np.asarray(weights, dtype=float)
+    C = S[:n_agg]
+    agg, bottom = forecasts[:n_agg], forecasts[n_agg:]
+    M = sp.diags(weights[:n_agg]) + C @ sp.diags(weights[n_agg:]) @ C.T
+    lagrange = spsolve(sp.csc_matrix(M), agg - C @ bottom).reshape(n_agg, -1)
+    return np.vstack([agg - weights[:n_agg, None] * lagrange, bottom + weights[n_agg:, None] * (C.T @ lagrange)])
+
+
+def ols(S, forecasts, history=None, weights=None):
+    return mint(S, forecasts)
+
+
+RECONCILER_FUNCS = {'bottom_up': bottom_up, 'top_down': top_down, 'ols': ols, 'mint': mint}
+
+
+def forecast_rows(S, method):
+    # Only the levels a method reads are forecast.
+    if method == 'bottom_up':
+        return np.arange(n_aggregates(S), S.shape[0])
+    if method == 'top_down':
+        return np.array([0])
+    return np.arange(S.shape[0])
+
+
+def forecast_nodes(history, index, rows, forecast_steps, order=DEFAULT_ORDER, alpha=0.05, workers=1):
+    # Base forecasts for the given rows of the (nodes x time) history, plus
+    # each node's one-step forecast variance, read back from the width of
+    # its first interval. Nodes whose fit fails fall back to the naive
+    # forecast and the variance of their one-step changes.
+    forecasts = np.full((len(history), forecast_steps), np.nan)
+    variances = np.full(len(history), np.nan)
+    histories = {row: pd.Series(history[row], index=index) for row in rows}
+    results = parallel_forecast(histories, [order], forecast_steps, workers=workers, alpha=alpha)
+    z = norm.ppf(1 - alpha / 2)
+    for result in results:
+        row = result['product_name']
+        if result['error'] is None:
+            forecasts[row] = result['forecast']
+            variances[row] = ((result['upper'][0] - result['lower'][0]) / (2 * z)) ** 2
+        else:
+            print(f"Error occurred while forecasting node {row}: {result['error']}; using the naive forecast", file=sys.stderr)
+            forecasts[row] = naive(history[row:row + 1], forecast_steps)[0]
+            variances[row] = np.var(np.diff(history[row]))
+    # A zero variance would make W singular; a perfectly fitted node just
+    # gets the smallest positive weight seen.
+    positive = variances[variances > 0]
+    variances[~(variances > 0)] = positive.min() if len(positive) else 1.0
+    return forecasts, variances
+
+
+def reconcile(method, S, forecasts, history=None, weights=None):
+    return RECONCILER_FUNCS[method](S, forecasts, history, weights)
+
+
+def forecast_hierarchy(histories, levels, forecast_steps, method='mint', order=DEFAULT_ORDER, alpha=0.05, workers=1):
+    # histories maps product -> Series of demand; products missing a period
+    # count as zero demand there. Returns the nodes, their (nodes x time)
+    # history, base and reconciled forecasts, and the forecast dates.
+    frame = pd.DataFrame(histories).sort_index().fillna(0.0)
+    S, nodes = summing_matrix(frame.columns, levels)
+    history = S @ frame.to_numpy().T
+    forecasts, variances = forecast_nodes(history, frame.index, forecast_rows(S, method), forecast_steps, order, alpha, workers)
+    reconciled = reconcile(method, S, forecasts, history, variances)
+    return nodes, history, forecasts, reconciled, forecast_index(frame.index, forecast_steps)
+
+
+def coherence_error(S, forecasts):
+    # Largest gap between an aggregate and the sum of its products.
+    n_agg = n_aggregates(S)
+    return float(np.max(np.abs(forecasts[:n_agg] - S[:n_agg] @ forecasts[n_agg:]), initial=0.0))
+
+
+def hierarchy_frame(nodes, forecasts, reconciled, dates):
+    n_nodes, steps = reconciled.shape
+    return pd.DataFrame({
+        'level': np.repeat([level for level, _ in nodes], steps),
+        'node': np.repeat([name for _, name in nodes], steps),
+        'step': np.tile(np.arange(1, steps + 1), n_nodes),
+        'date': np.tile(dates, n_nodes),
+        'base_forecast': forecasts.ravel(),
+        'forecast': reconciled.ravel(),
+    })
+
+
+def load_levels(path, level_cols, product_col='product_name'):
+    groups = pd.read_csv(path, dtype=str)
+    return [(level, dict(zip(groups[product_col], groups[level]))) for level in level_cols]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Forecast demand at product, group and total level and reconcile the levels so they add up.")
+    parser.add_argument('input', help="CSV or Parquet file in long format (one row per product and date)")
+    parser.add_argument('groups', help="CSV mapping every product to its groups, one column per level")
+    parser.add_argument('output', help="CSV file to write the forecasts of every node to")
+    parser.add_argument('--levels', nargs='+', default=['category'], help="group columns of the groups file, coarsest first")
+    parser.add_argument('--method', choices=RECONCILERS, default='mint')
+    parser.add_argument('--steps', type=int, default=12)
+    parser.add_argument('--order', nargs=3, type=int, default=list(DEFAULT_ORDER), metavar=('P', 'D', 'Q'))
+    parser.add_argument('--alpha', type=float, default=0.05)
+    parser.add_argument('--workers', type=int, default=1, help="number of worker processes (0 uses every core)")
+    parser.add_argument('--freq', default=DEFAULT_FREQ)
+    parser.add_argument('--product-col', default='product_name')
+    parser.add_argument('--date-col', default='date')
+    parser.add_argument('--demand-col', default='demand')
+    args = parser.parse_args(argv)
+
+    histories = load_histories(args.input, args.freq, args.product_col, args.date_col, args.demand_col)
+    levels = load_levels(args.groups, args.levels, args.product_col)
+    nodes, _, forecasts, reconciled, dates = forecast_hierarchy(histories, levels, args.steps, args.method, tuple(args.order), args.alpha, args.workers or None)
+    hierarchy_frame(nodes, forecasts, reconciled, dates).to_csv(args.output, index=False)
+    print(f"Reconciled {len(nodes)} nodes ({len(histories)} products) with {args.method} into {args.output}.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_FREQ = 'M'
+DEFAULT_START = '2023-01-31'
+
+
+def parse_demand(text):
+    # Accepts numbers separated by commas, semicolons and/or whitespace, with
+    # or without decimals, e.g. "120, 130,150 170.5".
+    values = [value for value in re.split(r'[,;\s]+', text.strip()) if value]
+    if not values:
+        raise ValueError("no demand values given")
+    try:
+        return [float(value) for value in values]
+    except ValueError:
+        raise ValueError(f"demand values must be numbers, got {text!r}") from None
+
+
+def history_index(n_periods, start=DEFAULT_START, freq=DEFAULT_FREQ):
+    return pd.date_range(start=start, periods=n_periods, freq=freq)
+
+
+def history_freq(index):
+    # The frequency the series was aggregated to, else one inferred from its
+    # dates (which needs three of them), else the default.
+    return index.freqstr or (pd.infer_freq(index) if len(index) >= 3 else None) or DEFAULT_FREQ
+
+
+def forecast_index(index, forecast_steps):
+    offset = pd.tseries.frequencies.to_offset(history_freq(index))
+    return pd.date_range(start=index[-1] + offset, periods=forecast_steps, freq=offset)
+
+
+def read_table(path):
+    if os.path.splitext(path)[1].lower() in ('.parquet', '.pq'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def read_chunks(path, columns, chunksize):
+    if os.path.splitext(path)[1].lower() in ('.parquet', '.pq'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("streaming Parquet files requires pyarrow") from None
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunksize)
+
+
+def aggregate(frame, date_col, qty_col, freq):
+    dates = pd.DatetimeIndex(pd.to_datetime(frame[date_col]))
+    return frame[qty_col].astype(float).set_axis(dates).resample(freq).sum()
+
+
+def combine(parts, freq):
+    # Partial aggregates of one product from consecutive chunks can share a
+    # period at the chunk boundary, so they are summed once more. Periods
+    # with no rows at all count as zero demand, as resample() does.
+    if len(parts) == 1:
+        return parts[0]
+    return pd.concat(parts).groupby(level=0).sum().asfreq(freq, fill_value=0.0)
+
+
+def load_histories(path, freq=DEFAULT_FREQ, product_col='product_name', date_col='date', demand_col='demand'):
+    # Reads the whole file at once; unlike stream_series the rows of a
+    # product do not need to be contiguous.
+    frame = read_table(path)
+    histories = {}
+    for product_name, group in frame.groupby(product_col, sort=False):
+        histories[product_name] = aggregate(group, date_col, demand_col, freq)
+    return histories
+
+
+def stream_series(path, freq=DEFAULT_FREQ, chunksize=100_000, product_col='product_name', date_col='date', qty_col='demand'):
+    # Yields (product, series) pairs from a long-format file, one product at
+    # a time, reading at most `chunksize` rows into memory. Each chunk is
+    # summed per `freq` period straight away, so only one product's
+    # aggregated series is ever held. The file must list each product's rows
+    # contiguously (any date order within a product is fine).
+    current, parts, seen = None, [], set()
+    for chunk in read_chunks(path, [product_col, date_col, qty_col], chunksize):
+        if len(chunk) == 0:
+            # e.g. a header-only CSV
+            continue
+        products = chunk[product_col].to_numpy()
+        bounds = np.flatnonzero(products[1:] != products[:-1]) + 1
+        for start, end in zip(np.r_[0, bounds], np.r_[bounds, len(products)]):
+            product_name = products[start]
+            if product_name != current:
+                if current is not None:
+                    yield current, combine(parts, freq)
+                if product_name in seen:
+                    raise ValueError(f"rows of product {product_name!r} are not contiguous; sort the file by product first")
+                seen.add(product_name)
+                current, parts = product_name, []
+            parts.append(aggregate(chunk.iloc[start:end], date_col, qty_col, freq))
+            if len(parts) >= 64:
+                parts = [combine(parts, freq)]
+    if current is not None:
+        yield current, combine(parts, freq)
@@ -0,0 +1,177 @@
+import contextvars
+import functools
+import json
+import os
+import platform
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+
+# Reports of the GUI scripts go here when set; the batch CLI takes --report.
+REPORT_DIR = os.environ.get('FORECAST_REPORT_DIR')
+
+
+class Run:
+    # Per-stage wall time and call counts plus named counters for one
+    # forecasting run. Instrumented code records into the module's current
+    # run through stage() and count(), so it needs no run passed around.
+
+    def __init__(self, name='run'):
+        self.name = name
+        self.run_id = uuid.uuid4().hex
+        self.started = time.time()
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+        self.extra = {}
+
+    def add_time(self, name, seconds, calls=1):
+        stage = self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0})
+        stage['calls'] += calls
+        stage['seconds'] += seconds
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self):
+        return {'stages': self.stages, 'counters': self.counters}
+
+    def merge(self, snapshot):
+        # Folds in what a worker process recorded for its share of the run.
+        for name, stage in snapshot['stages'].items():
+            self.add_time(name, stage['seconds'], stage['calls'])
+        for name, n in snapshot['counters'].items():
+            self.count(name, n)
+
+    def report(self):
+        import numpy as np
+        import pandas as pd
+        import statsmodels
+        return {
+            'name': self.name,
+            'run_id': self.run_id,
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'wall_seconds': time.perf_counter() - self.start,
+            'stages': self.stages,
+            'counters': self.counters,
+            'argv': sys.argv,
+            'versions': {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__, 'statsmodels': statsmodels.__version__},
+            **self.extra,
+        }
+
+    def write_report(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2, default=str)
+        return path
+
+
+# The run being recorded into. A context variable rather than a plain global,
+# so a GUI worker thread starting its own run, or a capture() in one thread,
+# does not swap the run out from under another thread. New threads start
+# from the shared default run until they call new_run().
+current = contextvars.ContextVar('instrumentation_run', default=Run())
+
+
+def current_run():
+    return current.get()
+
+
+def new_run(name='run'):
+    run = Run(name)
+    current.set(run)
+    return run
+
+
+@contextmanager
+def stage(name):
+    # Time is recorded even when the stage raises.
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        current_run().add_time(name, time.perf_counter() - start)
+
+
+def count(name, n=1):
+    current_run().count(name, n)
+
+
+@contextmanager
+def capture():
+    # Records into a fresh run for the duration, e.g. one worker task whose
+    # snapshot is sent back to the parent and merged there.
+    token = current.set(Run())
+    try:
+        yield current.get()
+    finally:
+        current.reset(token)
+
+
+def timed(iterable, name):
+    # Charges the time spent producing each item (e.g. reading and
+    # aggregating input) to a stage, without timing the consumer's work.
+    iterator = iter(iterable)
+    while True:
+        with stage(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def finish_run(run=None):
+    # Writes the run's report into REPORT_DIR, if one is configured.
+    run = run or current_run()
+    if REPORT_DIR:
+        return run.write_report(os.path.join(REPORT_DIR, f"{run.name}_{run.run_id}.json"))
+
+
+def reported(name):
+    # Decorator giving every call of the function its own run, reported via
+    # finish_run() whether it returns or raises.
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            run = new_run(name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                finish_run(run)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def profiled(run=None, profile_path=None, trace_memory=False, top=15):
+    # Opt-in capture around a whole run: cProfile stats are dumped to
+    # profile_path (open with pstats or snakeviz), and tracemalloc adds the
+    # peak traced memory and the largest allocation sites to the report.
+    run = run or current_run()
+    profiler = None
+    if profile_path:
+        import cProfile
+        profiler = cProfile.Profile()
+    if trace_memory:
+        import tracemalloc
+        tracemalloc.start()
+    if profiler:
+        profiler.enable()
+    try:
+        yield run
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+            run.extra['profile'] = profile_path
+        if trace_memory:
+            snapshot = tracemalloc.take_snapshot()
+            current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            run.extra['memory'] = {
+                'current_bytes': current_bytes,
+                'peak_bytes': peak_bytes,
+                'top': [{'where': str(stat.traceback[0]), 'bytes': stat.size, 'count': stat.count} for stat in snapshot.statistics('lineno')[:top]],
+            }
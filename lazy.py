@@ -0,0 +1,65 @@
+import importlib
+import threading
+
+# Modules the GUI scripts need once a forecast starts, in the order they are
+# worth warming up: the heavy third-party ones first.
+GUI_PRELOAD = (
+    'numpy',
+    'pandas',
+    'statsmodels.tsa.arima.model',
+    'matplotlib.pyplot',
+    'pymongo',
+    'forecasting',
+    'ingestion',
+    'simulation',
+    'rendering',
+    'bar_animation',
+    'persistence',
+    'forecast_codec',
+)
+
+
+class LazyModule:
+    # Stands in for a module until one of its attributes is used, then
+    # imports it (or picks up the copy a preload thread already imported)
+    # and forwards everything to it. Python's import lock makes a first use
+    # racing a preload simply wait for that import to finish.
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        if self._module is None:
+            self.__dict__['_module'] = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        return f"<lazy module {self._name!r}{' (loaded)' if self._module is not None else ''}>"
+
+
+def lazy_import(name):
+    return LazyModule(name)
+
+
+def preload(names=GUI_PRELOAD, on_done=None):
+    # Imports the modules on a daemon thread, e.g. while the user is still
+    # on the splash screen. Failures are left for the first real use to
+    # report. on_done, if given, is called on that thread at the end.
+    def run():
+        for name in names:
+            try:
+                importlib.import_module(name)
+            except Exception:
+                pass
+        if on_done:
+            on_done()
+    thread = threading.Thread(target=run, name='preload', daemon=True)
+    thread.start()
+    return thread
@@ -1,25 +1,26 @@
 # Import necessary libraries
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-from statsmodels.tsa.arima.model import ARIMA
-import pymongo
 import customtkinter
+import instrumentation
+from gui_worker import ForecastJob, checkpoint, stage_progress
+from lazy import GUI_PRELOAD, lazy_import, preload
+
+# Heavy modules are imported on first use, or by the preload started once the window
+# is up, so it appears without waiting for pandas, matplotlib, statsmodels or pymongo
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+plt = lazy_import('matplotlib.pyplot')
+forecasting = lazy_import('forecasting')
+ingestion = lazy_import('ingestion')
+rendering = lazy_import('rendering')
+simulation = lazy_import('simulation')
+persistence = lazy_import('persistence')
+forecast_codec = lazy_import('forecast_codec')
 
 # Define ARIMA model function
-def arima_model(train_data, order, forecast_steps):
-    history = [x for x in train_data]
-    predictions = []
-    for _ in range(forecast_steps):
-        try:
-            model = ARIMA(history, order=order)
-            model_fit = model.fit()
-            yhat = model_fit.forecast()[0]
-            predictions.append(yhat)
-            history.append(yhat)
-        except Exception as e:
-            print(f"Error occurred: {e}")
-    return predictions
+def arima_model(train_data, order, forecast_steps, progress=None):
+    # Errors propagate to the worker, which shows them in the status label,
+    # instead of returning a shortened (empty) prediction list
+    return forecasting.arima_forecast(train_data, order, forecast_steps, progress=progress)
 
 # Define function to update plot
 def update_line_plot():
@@ -31,67 +32,71 @@ def update_line_plot():
     plt.ylabel('Demand')
     plt.legend()
     plt.grid(True)
-    plt.savefig('line_plot.png')  # Save the plot as an image file
     plt.show()
 
-# Define function to start demand forecasting process
-def start_forecasting(product_name, demand, forecast_steps, screen_width, screen_height):
-    app.withdraw()  # Hide the main window
-
+# Define function to run the forecast (called on the background worker thread, so no Tk or plotting here)
+# Each call records per-stage timings, reported to FORECAST_REPORT_DIR when set
+@instrumentation.reported('line')
+def run_forecast(product_name, demand, forecast_steps, progress=None):
     # Sample data
-    data = {'date': pd.date_range(start='2023-01-01', end='2023-12-31', freq='M'), 'demand': demand}
+    data = {'date': ingestion.history_index(len(demand)), 'demand': demand}
 
     # Create DataFrame
-    global df
-    df = pd.DataFrame(data)
-    df.set_index('date', inplace=True)
+    with instrumentation.stage('dataframe'):
+        history = pd.DataFrame(data)
+        history.set_index('date', inplace=True)
 
     # Forecast for the specified number of steps
     order = (2, 1, 1)  # ARIMA order (p, d, q)
-    global predictions_with_noise, forecast_dates
-    predictions = arima_model(df['demand'], order, forecast_steps)
+    checkpoint(progress, 0, 3)  # fit, chart and store each fill a third of the progress bar
+    predictions, lower, upper = arima_model(history['demand'], order, forecast_steps, stage_progress(progress, 0, 3))
 
-    # Generate random noise with the same length as predictions
-    np.random.seed(0)  # for reproducibility
-    noise = np.random.normal(loc=0, scale=10, size=len(predictions))
-
-    # Add noise to the predictions
-    predictions_with_noise = predictions + noise
+    # Generate random noise with the same length as predictions and add it to the predictions
+    with instrumentation.stage('noise'):
+        noise = simulation.forecast_noise(product_name, len(predictions), scale=10)  # reproducible per product, without touching global state
+        noisy_predictions = predictions + noise
 
     # Generate forecast dates
-    forecast_dates = df.index[-1] + pd.DateOffset(months=1) * np.arange(1, forecast_steps + 1)
+    dates = history.index[-1] + pd.DateOffset(months=1) * np.arange(1, forecast_steps + 1)
+
+    # Save the line plot offscreen under a name derived from its data (a pending cancel stops here)
+    checkpoint(progress, 1, 3)
+    graph_data_path, rendered = rendering.render_chart('line', product_name, history['demand'], noisy_predictions, dates)
+
+    # Store data in MongoDB, unless cancelled while the chart was drawn
+    checkpoint(progress, 2, 3)
+    store_demand_forecast_data(product_name, history['demand'], predictions, lower, upper, forecast_steps, graph_data_path)
+    return history, noisy_predictions, dates
+
+# Define function to show a finished forecast (called on the Tk thread)
+def show_forecast(result):
+    app.withdraw()  # Hide the main window
+    global df, predictions_with_noise, forecast_dates
+    df, predictions_with_noise, forecast_dates = result
 
     # Create line plot
     update_line_plot()
 
-    # Store data in MongoDB
-    store_demand_forecast_data(product_name, demand, forecast_steps, 'line_plot.png')
+# Define function to start demand forecasting process
+def start_forecasting(product_name, demand, forecast_steps, screen_width, screen_height):
+    show_forecast(run_forecast(product_name, demand, forecast_steps))
 
 # Define function to store demand forecast data
-def store_demand_forecast_data(product_name, demand, forecast_steps, graph_data_path):
+def store_demand_forecast_data(product_name, history, forecast, lower, upper, forecast_steps, graph_data_path):
     try:
-        # Connect to MongoDB
-        client = pymongo.MongoClient("mongodb://127.0.0.1:27017")
-        db = client['Demand']
-        collection = db['demand_forecasting']
-
-        # Store demand, forecast steps, and graph data
-        document = {
-            'product_name': product_name,
-            'demand': demand,
-            'forecast_steps': forecast_steps,
-            'graph_data': graph_data_path  # Path to the saved image file
-        }
-        collection.insert_one(document)
+        # Get the shared, pooled MongoDB collection
+        collection = persistence.get_collection('Demand')
+
+        # Store history, forecast and intervals as compact float32 arrays, plus forecast steps and graph data
+        document = forecast_codec.encode_forecast_document(product_name, history, forecast, lower, upper, start=history.index[0], freq='M',
+                                                           forecast_steps=forecast_steps, graph_data=graph_data_path)  # Path to the saved image file
+        with persistence.ForecastWriter(collection) as writer:
+            writer.add(document)
         print("Data stored successfully in MongoDB.")
     except Exception as e:
+        instrumentation.count('store_failed')
         print(f"Error occurred while storing data in MongoDB: {e}")
 
-# Create the main application window
-app = customtkinter.CTk()
-app.title("DemandWise")
-customtkinter.set_appearance_mode("dark")
-
 # Define function to adjust window size and create widgets
 def adjust_window():
     screen_width = app.winfo_screenwidth()
@@ -142,16 +147,56 @@ def start_forecasting_page(screen_width, screen_height):
     def start_forecasting_on_page():
         product_name = product_name_entry.get()
         demand_str = demand_entry.get()
-        demand = list(map(int, demand_str.split(',')))
-        forecast_steps = int(forecast_steps_entry.get())
-
-        # Start forecasting
-        start_forecasting(product_name, demand, forecast_steps, screen_width, screen_height)
+        try:
+            demand = ingestion.parse_demand(demand_str)
+            forecast_steps = int(forecast_steps_entry.get())
+        except ValueError as e:
+            status_label.configure(text=f"Invalid input: {e}")
+            return
+
+        # Start forecasting on the worker thread, or queue it behind the running forecast
+        if forecast_job.submit(run_forecast, product_name, demand, forecast_steps):
+            progress_bar.set(0)
+            status_label.configure(text="Forecasting...")
+        else:
+            status_label.configure(text="Queued: starts when the current forecast finishes.")
+
+    # Define callbacks the worker delivers on the Tk thread
+    def update_progress(done, total):
+        progress_bar.set(done / total)
+
+    def forecast_done(result):
+        progress_bar.set(1)
+        status_label.configure(text="")
+        show_forecast(result)
+
+    def forecast_failed(e):
+        progress_bar.set(0)
+        status_label.configure(text=f"Error occurred: {e}")
+
+    def forecast_cancelled():
+        progress_bar.set(0)
+        status_label.configure(text="Forecast cancelled.")
+
+    forecast_job = ForecastJob(root, forecast_done, on_progress=update_progress, on_error=forecast_failed, on_cancel=forecast_cancelled)
+
+    def cancel_forecast():
+        if forecast_job.cancel():
+            status_label.configure(text="Cancelling: a model fit already running has to finish first.")
 
     # Create button to start forecasting
     b1 = customtkinter.CTkButton(root, text="Start Forecasting", width=0.09 * root_width, height=0.05 * root_height, corner_radius=50, command=start_forecasting_on_page)
     b1.pack(pady=(20, 0))  # Add vertical padding between the widget and the one above it
 
+    # Create button to cancel the running forecast, a progress bar and a status line
+    b2 = customtkinter.CTkButton(root, text="Cancel", width=0.09 * root_width, height=0.05 * root_height, corner_radius=50, command=cancel_forecast)
+    b2.pack(pady=(10, 0))  # Add vertical padding between the widget and the one above it
+    progress_bar = customtkinter.CTkProgressBar(root, width=int(0.4 * screen_height))
+    progress_bar.set(0)
+    progress_bar.pack(pady=(10, 0))  # Add vertical padding between the widget and the one above it
+    status_label = customtkinter.CTkLabel(root, text="", text_color="#faf9f9")
+    status_label.pack(pady=(5, 0))  # Add vertical padding between the widget and the one above it
+
     root.mainloop()
 
 # Define function to handle window closing event
@@ -159,7 +204,16 @@ def on_closing():
     app.destroy()
     plt.close('all')  # Close all matplotlib windows when the application is closed
 
-# Set up the main application window
-app.protocol("WM_DELETE_WINDOW", on_closing)
-adjust_window()
-app.mainloop()
+if __name__ == '__main__':
+    # Create the main application window
+    app = customtkinter.CTk()
+    app.title("DemandWise")
+    customtkinter.set_appearance_mode("dark")
+
+    # Set up the main application window
+    app.protocol("WM_DELETE_WINDOW", on_closing)
+    adjust_window()
+
+    # Warm up the forecasting modules in the background once the window has been drawn
+    app.after(100, preload, GUI_PRELOAD)
+    app.mainloop()
@@ -0,0 +1,71 @@
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+from bench_parallel import synthetic_catalogue
+
+
+async def request(reader, writer, host, body):
+    writer.write(
+        f"POST /forecast HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def client(host, port, bodies, latencies, statuses):
+    # One keep-alive connection sending its share of the requests in turn.
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for body in bodies:
+            start = time.perf_counter()
+            statuses.append(await request(reader, writer, host, body))
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, n_requests, concurrency, distinct, steps, seed=0):
+    # `distinct` series are requested in random order, so the mix of cache
+    # hits, coalesced requests and fresh fits depends on how it compares to
+    # n_requests.
+    series = list(synthetic_catalogue(distinct, seed=seed).values())
+    rng = np.random.default_rng(seed)
+    bodies = [json.dumps({'demand': series[i].tolist(), 'steps': steps}).encode() for i in rng.integers(0, distinct, size=n_requests)]
+    latencies, statuses = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, bodies[i::concurrency], latencies, statuses) for i in range(concurrency)))
+    return np.array(latencies), statuses, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test a running forecasting service (python service.py).")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=32, help="simultaneous keep-alive connections")
+    parser.add_argument('--distinct', type=int, default=50, help="different series among the requests")
+    parser.add_argument('--steps', type=int, default=12)
+    args = parser.parse_args()
+
+    latencies, statuses, seconds = asyncio.run(run_load(args.host, args.port, args.requests, args.concurrency, args.distinct, args.steps))
+    failed = sum(status != 200 for status in statuses)
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"{len(latencies)} requests ({failed} failed) in {seconds:.2f} s: {len(latencies) / seconds:.1f} requests/s, p50 {p50:.1f} ms, p99 {p99:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,44 +1,24 @@
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
-from statsmodels.tsa.arima.model import ARIMA
-import pymongo
 import customtkinter
-
-def arima_model(train_data, order, forecast_steps):
-    history = [x for x in train_data]
-    predictions = []
-    for _ in range(forecast_steps):
-        try:
-            model = ARIMA(history, order=order)
-            model_fit = model.fit()
-            yhat = model_fit.forecast()[0]
-            predictions.append(yhat)
-            history.append(yhat)
-        except Exception as e:
-            print(f"Error occurred: {e}")
-    return predictions
-
-def update_bar_plot(frame):
-    ax.clear()
-    ax.bar(df.index, df['demand'], label='Actual Demand', align='center', width=10)
-    forecast_dates = df.index[-1] + pd.DateOffset(months=1) * np.arange(1, frame + 1)
-    december_demand = df[df.index.month == 12]['demand'].values[0]
-    for i in range(frame):
-        if predictions_with_noise[i] < december_demand:
-            color = 'red'
-        else:
-            color = 'green'
-        ax.bar(forecast_dates[i], predictions_with_noise[i], label='Forecasted Demand', align='center', width=10, color=color, alpha=0.4)
-        ax.text(forecast_dates[i], predictions_with_noise[i], f"{forecast_dates[i].strftime('%b')[:3]}", ha='center', va='bottom')
-    ax.set_xticks(df.index.union(forecast_dates))
-    ax.set_xticklabels([date.strftime('%b') for date in df.index.union(forecast_dates)])
-    ax.set_title('Demand Forecasting with ARIMA')
-    ax.set_xlabel('Date')
-    ax.set_ylabel('Demand')
-    ax.legend()
-    return ax,
+import instrumentation
+from gui_worker import ForecastJob, checkpoint, stage_progress
+from lazy import GUI_PRELOAD, lazy_import, preload
+
+# Heavy modules are imported on first use, or by the preload started once the window
+# is up, so it appears without waiting for pandas, matplotlib, statsmodels or pymongo
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+plt = lazy_import('matplotlib.pyplot')
+animation = lazy_import('matplotlib.animation')
+forecasting = lazy_import('forecasting')
+ingestion = lazy_import('ingestion')
+bar_animation = lazy_import('bar_animation')
+rendering = lazy_import('rendering')
+simulation = lazy_import('simulation')
+persistence = lazy_import('persistence')
+forecast_codec = lazy_import('forecast_codec')
+
+def arima_model(train_data, order, forecast_steps, progress=None):
+    return forecasting.arima_forecast(train_data, order, forecast_steps, progress=progress)
 
 def update_line_plot(frame):
     plt.clf()
@@ -51,50 +31,49 @@ def update_line_plot(frame):
     plt.grid(True)
     plt.show()
 
-def start_forecasting(product_name, demand, forecast_steps, screen_width, screen_height):
-    app.withdraw()
-    data = {'date': pd.date_range(start='2023-01-01', end='2023-12-31', freq='M'), 'demand': demand}
-    global df
-    df = pd.DataFrame(data)
-    df.set_index('date', inplace=True)
+@instrumentation.reported('main')
+def run_forecast(product_name, demand, forecast_steps, progress=None):
+    with instrumentation.stage('dataframe'):
+        data = {'date': ingestion.history_index(len(demand)), 'demand': demand}
+        history = pd.DataFrame(data)
+        history.set_index('date', inplace=True)
     order = (2, 1, 1)
-    global predictions_with_noise
-    predictions = arima_model(df['demand'], order, forecast_steps)
-    np.random.seed(0)
-    noise = np.random.normal(loc=0, scale=10, size=len(predictions))
-    predictions_with_noise = predictions + noise
-    global forecast_dates
-    forecast_dates = df.index[-1] + pd.DateOffset(months=1) * np.arange(1, forecast_steps + 1)
-    global fig, ax
+    checkpoint(progress, 0, 3)
+    predictions, lower, upper = arima_model(history['demand'], order, forecast_steps, stage_progress(progress, 0, 3))
+    with instrumentation.stage('noise'):
+        noise = simulation.forecast_noise(product_name, len(predictions), scale=10)
+        noisy_predictions = predictions + noise
+    dates = history.index[-1] + pd.DateOffset(months=1) * np.arange(1, forecast_steps + 1)
+    checkpoint(progress, 1, 3)
+    graph_data_path, rendered = rendering.render_chart('bar', product_name, history['demand'], noisy_predictions, dates)
+    checkpoint(progress, 2, 3)
+    store_demand_forecast_data(product_name, history['demand'], predictions, lower, upper, forecast_steps, graph_data_path)
+    return history, noisy_predictions, dates, graph_data_path
+
+def show_forecast(result):
+    app.withdraw()
+    global df, predictions_with_noise, forecast_dates
+    df, predictions_with_noise, forecast_dates, graph_data_path = result
+    global fig, ax, bar_anim
     fig, ax = plt.subplots(figsize=(10, 6))
-    ani = FuncAnimation(fig, update_bar_plot, frames=forecast_steps + 1, blit=True, repeat=False)
-    ax.set_xlabel('Date')
-    ax.set_ylabel('Demand')
-    graph_data_path = f"forecast_plot_{product_name}.png"
-    plt.savefig(graph_data_path)
+    bar_anim = bar_animation.ForecastBarAnimation(ax, df['demand'], predictions_with_noise, forecast_dates)
+    bar_anim.start()
     plt.show()
-    store_demand_forecast_data(product_name, demand, forecast_steps, graph_data_path)
 
-def store_demand_forecast_data(product_name, demand, forecast_steps, graph_data_path):
+def start_forecasting(product_name, demand, forecast_steps, screen_width, screen_height):
+    show_forecast(run_forecast(product_name, demand, forecast_steps))
+
+def store_demand_forecast_data(product_name, history, forecast, lower, upper, forecast_steps, graph_data_path):
     try:
-        client = pymongo.MongoClient("mongodb://127.0.0.1:27017")
-        db = client['MPR']
-        collection = db['demand_forecasting']
-        document = {
-            'product_name': product_name,
-            'demand': demand,
-            'forecast_steps': forecast_steps,
-            'graph_data': graph_data_path
-        }
-        collection.insert_one(document)
+        collection = persistence.get_collection('MPR')
+        document = forecast_codec.encode_forecast_document(product_name, history, forecast, lower, upper, start=history.index[0], freq='M', forecast_steps=forecast_steps, graph_data=graph_data_path)
+        with persistence.ForecastWriter(collection) as writer:
+            writer.add(document)
         print("Data stored successfully in MongoDB.")
     except Exception as e:
+        instrumentation.count('store_failed')
         print(f"Error occurred while storing data in MongoDB: {e}")
 
-app = customtkinter.CTk()
-app.title("DemandWise")
-customtkinter.set_appearance_mode("dark")
-
 def adjust_window():
     screen_width = app.winfo_screenwidth()
     screen_height = app.winfo_screenheight()
@@ -116,9 +95,39 @@ def start_forecasting_page(screen_width, screen_height):
     def start_forecasting_on_page():
         product_name = product_name_entry.get()
         demand_str = demand_entry.get()
-        demand = list(map(int, demand_str.split(',')))
-        forecast_steps = int(forecast_steps_entry.get())
-        start_forecasting(product_name, demand, forecast_steps, screen_width, screen_height)
+        try:
+            demand = ingestion.parse_demand(demand_str)
+            forecast_steps = int(forecast_steps_entry.get())
+        except ValueError as e:
+            status_label.configure(text=f"Invalid input: {e}")
+            return
+        if forecast_job.submit(run_forecast, product_name, demand, forecast_steps):
+            progress_bar.set(0)
+            status_label.configure(text="Forecasting...")
+        else:
+            status_label.configure(text="Queued: starts when the current forecast finishes.")
+
+    def update_progress(done, total):
+        progress_bar.set(done / total)
+
+    def forecast_done(result):
+        progress_bar.set(1)
+        status_label.configure(text="")
+        show_forecast(result)
+
+    def forecast_failed(e):
+        progress_bar.set(0)
+        status_label.configure(text=f"Error occurred: {e}")
+
+    def forecast_cancelled():
+        progress_bar.set(0)
+        status_label.configure(text="Forecast cancelled.")
+
+    forecast_job = ForecastJob(root, forecast_done, on_progress=update_progress, on_error=forecast_failed, on_cancel=forecast_cancelled)
+
+    def cancel_forecast():
+        if forecast_job.cancel():
+            status_label.configure(text="Cancelling: a model fit already running has to finish first.")
 
     label_width = int(0.4 * screen_height)
     l1 = customtkinter.CTkLabel(root, text="Product Name:", width=label_width, text_color="#118ab2", font=("Arial", screen_height*0.043))
@@ -135,6 +144,13 @@ def start_forecasting_page(screen_width, screen_height):
     forecast_steps_entry.pack(pady=(0, 20))
     b1 = customtkinter.CTkButton(root, text="Start Forecasting", width=0.09 * screen_width, height=0.05 * screen_height, corner_radius=50, command=start_forecasting_on_page)
     b1.pack(pady=(20, 0))
+    b3 = customtkinter.CTkButton(root, text="Cancel", width=0.09 * screen_width, height=0.05 * screen_height, corner_radius=50, command=cancel_forecast)
+    b3.pack(pady=(10, 0))
+    progress_bar = customtkinter.CTkProgressBar(root, width=int(0.4 * screen_height))
+    progress_bar.set(0)
+    progress_bar.pack(pady=(10, 0))
+    status_label = customtkinter.CTkLabel(root, text="", text_color="#faf9f9")
+    status_label.pack(pady=(5, 0))
     b2 = customtkinter.CTkButton(root, text="Show Line Graph", width=0.09 * screen_width, height=0.05 * screen_height, corner_radius=50, command=start_line_plot_animation)
     b2.pack(pady=(10, 0))
     root.protocol("WM_DELETE_WINDOW", on_closing)
@@ -149,7 +165,7 @@ def on_closing():
 
 def start_line_plot_animation():
     fig, ax = plt.subplots(figsize=(10, 6))
-    ani = FuncAnimation(fig, update_line_plot, frames=len(df), blit=False, repeat=False)
+    ani = animation.FuncAnimation(fig, update_line_plot, frames=len(df), blit=False, repeat=False)
     ax.set_xlabel('Date')
     ax.set_ylabel('Demand')
     plt.show()
@@ -166,13 +182,18 @@ def start_line_plot():
 
 def start_line_plot_animation():
     fig, ax = plt.subplots(figsize=(10, 6))
-    ani = FuncAnimation(fig, update_line_plot, frames=len(df)+1, blit=False, repeat=False)
+    ani = animation.FuncAnimation(fig, update_line_plot, frames=len(df)+1, blit=False, repeat=False)
     ax.set_xlabel('Date')
     ax.set_ylabel('Demand')
     plt.show()
 
-adjust_window()
-app.mainloop()
+if __name__ == '__main__':
+    app = customtkinter.CTk()
+    app.title("DemandWise")
+    customtkinter.set_appearance_mode("dark")
+    adjust_window()
+    app.after(100, preload, GUI_PRELOAD)
+    app.mainloop()
 
 
 
@@ -0,0 +1,98 @@
+import hashlib
+import os
+
+import numpy as np
+from statsmodels.tsa.arima.model import ARIMA
+
+import instrumentation
+from forecasting import fit_arima, series_hash
+
+FIT_MODES = ('extend', 'warm')
+
+
+class ModelStore:
+    # Fitted ARIMA parameters on disk, one .npz file per (product, order).
+    # File modification times double as the LRU clock: loading an entry
+    # touches its file, and eviction removes the oldest files first.
+
+    def __init__(self, directory, max_entries=None, mode='extend', refresh_every=12):
+        if mode not in FIT_MODES:
+            raise ValueError(f"mode must be one of {FIT_MODES}, got {mode!r}")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_entries = max_entries
+        self.mode = mode
+        self.refresh_every = refresh_every
+        self.n_entries = len(self.entry_paths()) if max_entries else 0
+
+    def entry_paths(self):
+        return [entry.path for entry in os.scandir(self.directory) if entry.name.endswith('.npz') and not entry.name.endswith('.tmp.npz')]
+
+    def path(self, product_name, order):
+        key = hashlib.sha1(f"{product_name}|{tuple(order)}".encode()).hexdigest()
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def load(self, product_name, order):
+        path = self.path(product_name, order)
+        try:
+            with np.load(path) as entry:
+                saved = {name: entry[name] for name in entry.files}
+        except (OSError, ValueError):
+            return None
+        os.utime(path)
+        saved['history_hash'] = str(saved['history_hash'])
+        saved['nobs'] = int(saved['nobs'])
+        saved['extensions'] = int(saved['extensions'])
+        return saved
+
+    def save(self, product_name, order, params, history, extensions=0):
+        path = self.path(product_name, order)
+        exists = os.path.exists(path)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, params=np.asarray(params, dtype=float), nobs=len(history), history_hash=series_hash(history), extensions=extensions)
+        os.replace(tmp_path, path)
+        if self.max_entries and not exists:
+            self.n_entries += 1
+            if self.n_entries > self.max_entries:
+                self.evict()
+
+    def evict(self):
+        if not self.max_entries:
+            return 0
+        paths = sorted(self.entry_paths(), key=os.path.getmtime)
+        stale = paths[:max(0, len(paths) - self.max_entries)]
+        for path in stale:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self.n_entries = len(paths) - len(stale)
+        return len(stale)
+
+    def fit(self, product_name, history, order):
+        # Returns (model_fit, how) where how is 'cached', 'extended', 'warm'
+        # or 'cold' depending on how much of the saved model could be reused.
+        history = np.asarray(history, dtype=float)
+        order = tuple(order)
+        saved = self.load(product_name, order)
+        if saved is not None and len(history) >= saved['nobs'] and series_hash(history[:saved['nobs']]) == saved['history_hash']:
+            model = ARIMA(history, order=order)
+            extensions = saved['extensions'] + len(history) - saved['nobs']
+            if len(history) == saved['nobs']:
+                model_fit, how = model.filter(saved['params']), 'cached'
+            elif self.mode == 'extend' and extensions <= self.refresh_every:
+                # Run the Kalman filter over the new points with the saved
+                # parameters; no likelihood optimisation at all.
+                model_fit, how = model.filter(saved['params']), 'extended'
+            else:
+                model_fit, how = fit_arima(history, order, start_params=saved['params']), 'warm'
+                extensions = 0
+            if how != 'cached':
+                self.save(product_name, order, model_fit.params, history, extensions)
+            instrumentation.count(f"model_store_{how}")
+            return model_fit, how
+
+        model_fit = fit_arima(history, order)
+        self.save(product_name, order, model_fit.params, history)
+        instrumentation.count('model_store_cold')
+        return model_fit, 'cold'
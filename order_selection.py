@@ -0,0 +1,119 @@
+import json
+import os
+import warnings
+
+import numpy as np
+from statsmodels.tsa.stattools import kpss
+
+import instrumentation
+from forecasting import fit_arima, series_hash
+from parallel import parallel_map
+
+CRITERIA = ('aic', 'aicc', 'bic')
+
+
+def select_d(series, max_d=2, alpha=0.05):
+    # Difference until the KPSS test no longer rejects stationarity, so the
+    # (p, q) search only ever runs at a single d.
+    values = np.asarray(series, dtype=float)
+    for d in range(max_d):
+        if len(values) < 4 or np.ptp(values) == 0:
+            return d
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            p_value = kpss(values, regression='c', nlags='auto')[1]
+        if p_value >= alpha:
+            return d
+        values = np.diff(values)
+    return max_d
+
+
+def n_params(order):
+    p, d, q = order
+    return p + q + (d == 0) + 1
+
+
+def neighbours(order, max_p, max_q):
+    p, d, q = order
+    for dp, dq in ((-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (1, 1)):
+        if 0 <= p + dp <= max_p and 0 <= q + dq <= max_q:
+            yield (p + dp, d, q + dq)
+
+
+def search_order(series, d, max_p=3, max_q=3, criterion='aic', max_rounds=10):
+    if criterion not in CRITERIA:
+        raise ValueError(f"criterion must be one of {CRITERIA}, got {criterion!r}")
+    scores = {}
+    max_params = (len(series) - d) // 2
+
+    def score(order):
+        # Every candidate is fitted at most once; neighbourhoods of successive
+        # rounds overlap heavily, so most lookups hit this dict. Orders with
+        # more parameters than the history can support are never fitted.
+        if order not in scores and n_params(order) > max_params:
+            scores[order] = np.inf
+        if order not in scores:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                try:
+                    model_fit = fit_arima(series, order)
+                    scores[order] = getattr(model_fit, criterion) if np.isfinite(model_fit.llf) else np.inf
+                except Exception:
+                    scores[order] = np.inf
+        return scores[order]
+
+    start = [(min(2, max_p), d, min(2, max_q)), (0, d, 0), (min(1, max_p), d, 0), (0, d, min(1, max_q))]
+    best = min(start, key=score)
+    for _ in range(max_rounds):
+        candidate = min(neighbours(best, max_p, max_q), key=score, default=best)
+        # Stop as soon as no neighbour improves the criterion.
+        if not score(candidate) < score(best):
+            break
+        best = candidate
+    return best, scores
+
+
+def auto_order(series, max_p=3, max_d=2, max_q=3, criterion='aic'):
+    series = np.asarray(series, dtype=float)
+    d = select_d(series, max_d)
+    return search_order(series, d, max_p, max_q, criterion)[0]
+
+
+def order_cache_key(series, criterion='aic'):
+    return f"{series_hash(series)}:{criterion}"
+
+
+def load_order_cache(path):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {key: tuple(order) for key, order in json.load(f).items()}
+
+
+def save_order_cache(cache, path):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({key: list(order) for key, order in cache.items()}, f)
+    os.replace(tmp_path, path)
+
+
+def auto_order_task(task):
+    series, max_p, max_d, max_q, criterion = task
+    with instrumentation.capture() as run:
+        order = auto_order(series, max_p, max_d, max_q, criterion)
+    return order, run.snapshot()
+
+
+def select_orders(histories, cache=None, max_p=3, max_d=2, max_q=3, criterion='aic', workers=1):
+    # Returns {product: order}, searching only products whose series hash is
+    # not already in the cache. The cache is updated in place.
+    cache = {} if cache is None else cache
+    keys = {product_name: order_cache_key(history, criterion) for product_name, history in histories.items()}
+    missing = [product_name for product_name, key in keys.items() if key not in cache]
+    tasks = [(np.asarray(histories[product_name], dtype=float), max_p, max_d, max_q, criterion) for product_name in missing]
+    for product_name, (order, snapshot) in zip(missing, parallel_map(auto_order_task, tasks, workers)):
+        cache[keys[product_name]] = order
+        instrumentation.current_run().merge(snapshot)
+    instrumentation.count('orders_searched', len(missing))
+    instrumentation.count('orders_cached', len(keys) - len(missing))
+    return {product_name: cache[key] for product_name, key in keys.items()}
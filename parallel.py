@@ -0,0 +1,104 @@
+import math
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+
+import instrumentation
+from forecasting import arima_forecast, forecast_from_fit
+from model_store import ModelStore
+from seasonal import seasonal_forecast
+
+BLAS_THREAD_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'VECLIB_MAXIMUM_THREADS', 'NUMEXPR_NUM_THREADS')
+
+
+@contextmanager
+def blas_thread_env(threads):
+    # Worker processes inherit the environment they are started with, so the
+    # limit has to be in place before the pool spawns them.
+    saved = {var: os.environ.get(var) for var in BLAS_THREAD_VARS}
+    os.environ.update({var: str(threads) for var in BLAS_THREAD_VARS})
+    try:
+        yield
+    finally:
+        for var, value in saved.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+
+
+def limit_blas_threads(threads):
+    # Forked workers have BLAS initialised already; threadpoolctl can still
+    # shrink their thread pools at runtime when it is installed.
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return
+    threadpool_limits(limits=threads)
+
+
+model_stores = {}
+
+
+def worker_model_store(directory):
+    # Workers never evict; the parent evicts once the whole batch is done.
+    if directory not in model_stores:
+        model_stores[directory] = ModelStore(directory)
+    return model_stores[directory]
+
+
+def forecast_task(task):
+    product_name, history, order, forecast_steps, refit, alpha, model_store_dir, seasonal = task
+    result = {'product_name': product_name, 'order': order, 'forecast': None, 'lower': None, 'upper': None, 'error': None, 'fit': 'cold'}
+    with instrumentation.capture() as run, warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        try:
+            if seasonal:
+                # (period, method, seasonal_order, harmonics); saved models
+                # are plain ARIMA, so seasonal fits bypass the model store.
+                period, method, seasonal_order, harmonics = seasonal
+                result['forecast'], result['lower'], result['upper'] = seasonal_forecast(history, order, forecast_steps, period, method, seasonal_order, harmonics, alpha)
+            elif model_store_dir and not refit:
+                model_fit, result['fit'] = worker_model_store(model_store_dir).fit(product_name, history, order)
+                result['forecast'], result['lower'], result['upper'] = forecast_from_fit(model_fit, forecast_steps, alpha)
+            else:
+                result['forecast'], result['lower'], result['upper'] = arima_forecast(history, order, forecast_steps, refit=refit, alpha=alpha)
+        except Exception as e:
+            result['error'] = str(e)
+    result['metrics'] = run.snapshot()
+    return result
+
+
+def default_chunksize(n_tasks, workers):
+    return max(1, math.ceil(n_tasks / (workers * 4)))
+
+
+def parallel_map(func, tasks, workers=None, chunksize=None, blas_threads=1):
+    tasks = list(tasks)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        return [func(task) for task in tasks]
+
+    chunksize = chunksize or default_chunksize(len(tasks), workers)
+    with blas_thread_env(blas_threads):
+        with ProcessPoolExecutor(max_workers=workers, initializer=limit_blas_threads, initargs=(blas_threads,)) as executor:
+            # executor.map yields results in submission order, so the output
+            # lines up with the tasks regardless of which worker ran them.
+            return list(executor.map(func, tasks, chunksize=chunksize))
+
+
+def parallel_forecast(histories, orders, forecast_steps, workers=None, chunksize=None, refit=False, alpha=0.05, blas_threads=1, model_store_dir=None, seasonal=None):
+    # orders is either a list applied to every product or a dict mapping each
+    # product to its own list of orders.
+    tasks = [
+        (product_name, np.asarray(history, dtype=float), tuple(order), forecast_steps, refit, alpha, model_store_dir, seasonal)
+        for product_name, history in histories.items()
+        for order in (orders[product_name] if isinstance(orders, dict) else orders)
+    ]
+    results = parallel_map(forecast_task, tasks, workers, chunksize, blas_threads)
+    for result in results:
+        instrumentation.current_run().merge(result.pop('metrics'))
+    return results
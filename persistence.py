@@ -0,0 +1,117 @@
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+import bson
+import pymongo
+from pymongo import UpdateOne
+
+import instrumentation
+
+MONGO_URI = "mongodb://127.0.0.1:27017"
+COLLECTION_NAME = 'demand_forecasting'
+
+clients = {}
+indexed_collections = set()
+lock = threading.Lock()
+
+
+def get_client(uri=MONGO_URI, max_pool_size=50):
+    # One MongoClient per URI for the whole process; pymongo pools the
+    # connections behind it, so every caller shares the same handshakes.
+    # "mongomock://" gives an in-memory stand-in for tests and dry runs.
+    with lock:
+        if uri not in clients:
+            if uri.startswith('mongomock://'):
+                import mongomock
+                clients[uri] = mongomock.MongoClient()
+            else:
+                clients[uri] = pymongo.MongoClient(uri, maxPoolSize=max_pool_size)
+        return clients[uri]
+
+
+def close_clients():
+    with lock:
+        for client in clients.values():
+            client.close()
+        clients.clear()
+        indexed_collections.clear()
+
+
+def ensure_indexes(collection):
+    # Only documents written with a run_id are unique per (product, run):
+    # older documents have no run_id and demand.py's have no product_name,
+    # and duplicates among those must not stop the index from being built.
+    collection.create_index(
+        [('product_name', pymongo.ASCENDING), ('run_id', pymongo.ASCENDING)],
+        unique=True, partialFilterExpression={'run_id': {'$exists': True}},
+    )
+    collection.create_index([('product_name', pymongo.ASCENDING), ('run_timestamp', pymongo.DESCENDING)])
+    collection.create_index([('run_timestamp', pymongo.DESCENDING)])
+
+
+def get_collection(db_name, collection_name=COLLECTION_NAME, uri=MONGO_URI):
+    collection = get_client(uri)[db_name][collection_name]
+    key = (uri, db_name, collection_name)
+    with lock:
+        if key not in indexed_collections:
+            ensure_indexes(collection)
+            indexed_collections.add(key)
+    return collection
+
+
+def new_run_id():
+    return f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+
+class ForecastWriter:
+    # Buffers forecast documents and writes them as unordered bulk upserts
+    # keyed by (product_name, run_id). The buffer is flushed once it holds
+    # flush_size documents, when flush_interval seconds have passed since the
+    # last flush at the time a document is added, and on close.
+
+    def __init__(self, collection, run_id=None, flush_size=500, flush_interval=5.0):
+        self.collection = collection
+        self.run_id = run_id or new_run_id()
+        self.run_timestamp = datetime.now(timezone.utc)
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.written = 0
+        self.last_flush = time.monotonic()
+        self.lock = threading.Lock()
+
+    def add(self, document):
+        document = dict(document, run_id=document.get('run_id', self.run_id), run_timestamp=document.get('run_timestamp', self.run_timestamp))
+        with self.lock:
+            self.buffer.append(document)
+            due = len(self.buffer) >= self.flush_size or time.monotonic() - self.last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            documents, self.buffer = self.buffer, []
+            self.last_flush = time.monotonic()
+        if not documents:
+            return 0
+        requests = [
+            UpdateOne({'product_name': document.get('product_name'), 'run_id': document['run_id']}, {'$set': document}, upsert=True)
+            for document in documents
+        ]
+        with instrumentation.stage('store'):
+            self.collection.bulk_write(requests, ordered=False)
+        self.written += len(documents)
+        instrumentation.count('documents_written', len(documents))
+        instrumentation.count('bytes_written', sum(len(bson.encode(document)) for document in documents))
+        return len(documents)
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,86 @@
+import hashlib
+import os
+import re
+
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+import instrumentation
+from bar_animation import ForecastBarAnimation
+from parallel import parallel_map
+
+CHART_DIR = 'charts'
+
+
+def draw_bar_chart(ax, history, forecast, forecast_dates):
+    ForecastBarAnimation(ax, history, forecast, forecast_dates).show_all()
+
+
+def draw_line_chart(ax, history, forecast, forecast_dates):
+    ax.plot(history.index, history.values, label='Actual Demand', marker='o')
+    ax.plot(forecast_dates, forecast, label='Forecasted Demand', marker='o')
+    ax.set_title('Demand Forecasting with ARIMA')
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Demand')
+    ax.legend()
+    ax.grid(True)
+
+
+CHART_DRAWERS = {'bar': draw_bar_chart, 'line': draw_line_chart}
+
+
+def chart_hash(kind, product_name, history, forecast, forecast_dates):
+    digest = hashlib.sha1(f"{kind}|{product_name}".encode())
+    digest.update(np.ascontiguousarray(history.values, dtype=np.float64).tobytes())
+    digest.update(history.index.asi8.tobytes())
+    digest.update(np.ascontiguousarray(forecast, dtype=np.float64).tobytes())
+    digest.update(pd.DatetimeIndex(forecast_dates).asi8.tobytes())
+    return digest.hexdigest()
+
+
+def chart_path(out_dir, kind, product_name, digest):
+    safe_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', str(product_name))[:60]
+    return os.path.join(out_dir, f"{kind}_{safe_name}_{digest[:16]}.png")
+
+
+def render_chart(kind, product_name, history, forecast, forecast_dates, out_dir=CHART_DIR, dpi=100):
+    # Returns (path, rendered). Filenames embed a hash of the chart's data,
+    # so an existing file already shows exactly this forecast and is reused.
+    forecast_dates = pd.DatetimeIndex(forecast_dates)
+    path = chart_path(out_dir, kind, product_name, chart_hash(kind, product_name, history, forecast, forecast_dates))
+    if os.path.exists(path):
+        return path, False
+    with instrumentation.stage('render'):
+        fig = Figure(figsize=(10, 6))
+        FigureCanvasAgg(fig)
+        CHART_DRAWERS[kind](fig.subplots(), history, forecast, forecast_dates)
+        os.makedirs(out_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        fig.savefig(tmp_path, format='png', dpi=dpi)
+        os.replace(tmp_path, path)
+    instrumentation.count('charts_rendered')
+    instrumentation.count('chart_bytes', os.path.getsize(path))
+    return path, True
+
+
+def render_task(task):
+    with instrumentation.capture() as run:
+        path, rendered = render_chart(*task)
+    return path, rendered, run.snapshot()
+
+
+def render_charts(jobs, out_dir=CHART_DIR, kinds=('bar',), workers=None, chunksize=None, dpi=100):
+    # jobs is an iterable of (product_name, history, forecast, forecast_dates)
+    # with history a pandas Series indexed by date. Returns one
+    # (product_name, kind, path, rendered) tuple per chart, in job order.
+    tasks = [
+        (kind, product_name, history, np.asarray(forecast, dtype=float), pd.DatetimeIndex(forecast_dates), out_dir, dpi)
+        for product_name, history, forecast, forecast_dates in jobs
+        for kind in kinds
+    ]
+    results = parallel_map(render_task, tasks, workers, chunksize)
+    for *_, snapshot in results:
+        instrumentation.current_run().merge(snapshot)
+    return [(task[1], task[0], path, rendered) for task, (path, rendered, _) in zip(tasks, results)]
@@ -0,0 +1,57 @@
+import numpy as np
+
+from forecasting import fit_arima, forecast_from_fit
+
+SEASONAL_METHODS = ('auto', 'sarima', 'fourier')
+DEFAULT_SEASONAL_ORDER = (0, 1, 1)
+# Above this period a seasonal state space gets too large to fit quickly
+# (its state grows with P * period + D * period), so 'auto' switches to
+# Fourier regressors.
+FOURIER_THRESHOLD = 24
+DEFAULT_HARMONICS = 4
+
+
+def resolve_method(period, method='auto'):
+    if method == 'auto':
+        return 'sarima' if period <= FOURIER_THRESHOLD else 'fourier'
+    return method
+
+
+def seasonal_fields(period, method='auto', seasonal_order=DEFAULT_SEASONAL_ORDER, harmonics=DEFAULT_HARMONICS):
+    # What a stored forecast records about its seasonal model: the model
+    # name plus the settings that model actually used.
+    method = resolve_method(period, method)
+    if method == 'sarima':
+        return {'model': 'sarima', 'seasonal': {'method': method, 'period': period, 'seasonal_order': list(seasonal_order)}}
+    return {'model': 'arima_fourier', 'seasonal': {'method': method, 'period': period, 'harmonics': max(1, min(harmonics, period // 2))}}
+
+
+def fourier_terms(n_periods, period, harmonics=DEFAULT_HARMONICS, offset=0):
+    # sin/cos pairs of the first `harmonics` frequencies of the cycle as an
+    # exog matrix. offset continues the phase, so the forecast rows line up
+    # with the end of the history. For an even period the harmonic at
+    # period / 2 has an all-zero sine, so only its cosine is kept.
+    harmonics = max(1, min(harmonics, period // 2))
+    t = np.arange(offset, offset + n_periods)[:, None]
+    k = np.arange(1, harmonics + 1)
+    angles = 2 * np.pi * t * k[None, :] / period
+    return np.hstack([np.sin(angles[:, 2 * k != period]), np.cos(angles)])
+
+
+def fit_seasonal(history, order, period, method='auto', seasonal_order=DEFAULT_SEASONAL_ORDER, harmonics=DEFAULT_HARMONICS):
+    # Returns (model_fit, method) with method resolved to 'sarima' or
+    # 'fourier'.
+    history = np.asarray(history, dtype=float)
+    method = resolve_method(period, method)
+    if method == 'sarima':
+        P, D, Q = seasonal_order
+        if len(history) <= (D + 1) * period:
+            raise ValueError(f"SARIMA with period {period} needs more than {(D + 1) * period} observations, got {len(history)}")
+        return fit_arima(history, order, seasonal_order=(P, D, Q, period)), method
+    return fit_arima(history, order, exog=fourier_terms(len(history), period, harmonics)), method
+
+
+def seasonal_forecast(history, order, forecast_steps, period, method='auto', seasonal_order=DEFAULT_SEASONAL_ORDER, harmonics=DEFAULT_HARMONICS, alpha=0.05):
+    model_fit, method = fit_seasonal(history, order, period, method, seasonal_order, harmonics)
+    exog = fourier_terms(forecast_steps, period, harmonics, offset=len(history)) if method == 'fourier' else None
+    return forecast_from_fit(model_fit, forecast_steps, alpha, exog=exog)
@@ -0,0 +1,228 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+
+import numpy as np
+
+from forecasting import DEFAULT_ORDER, arima_forecast, series_hash
+from ingestion import DEFAULT_FREQ, DEFAULT_START, forecast_index, history_index
+from parallel import blas_thread_env, limit_blas_threads
+
+MAX_BODY = 1 << 20
+
+
+class TTLCache:
+    # LRU cache whose entries also expire `ttl` seconds after being stored.
+
+    def __init__(self, max_entries=10000, ttl=300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        stored, value = entry
+        if time.monotonic() - stored > self.ttl:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = (time.monotonic(), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+def forecast_job(history, order, forecast_steps, alpha, refit):
+    # Runs in a worker process.
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        forecast, lower, upper = arima_forecast(history, order, forecast_steps, refit=refit, alpha=alpha)
+    return json_values(forecast), json_values(lower), json_values(upper)
+
+
+def json_values(values):
+    # NaN and inf are not valid JSON; they are sent as null.
+    return [float(value) if np.isfinite(value) else None for value in values]
+
+
+def parse_request(payload):
+    # Validates a /forecast body before anything is fitted and returns the
+    # arguments of forecast_job plus the forecast dates, raising ValueError
+    # with a message meant for the caller.
+    if not isinstance(payload, dict):
+        raise ValueError("request body must be a JSON object")
+    demand = payload.get('demand')
+    if not isinstance(demand, list) or len(demand) < 3:
+        raise ValueError("'demand' must be a list of at least 3 numbers")
+    history = np.asarray(demand, dtype=float)
+    if not np.all(np.isfinite(history)):
+        raise ValueError("'demand' must not contain NaN or infinite values")
+    order = tuple(int(value) for value in payload.get('order', DEFAULT_ORDER))
+    if len(order) != 3 or min(order) < 0:
+        raise ValueError("'order' must be three non-negative integers")
+    forecast_steps = int(payload.get('steps', 12))
+    if not 1 <= forecast_steps <= 1000:
+        raise ValueError("'steps' must be between 1 and 1000")
+    alpha = float(payload.get('alpha', 0.05))
+    if not 0 < alpha < 1:
+        raise ValueError("'alpha' must be between 0 and 1")
+    index = history_index(len(history), payload.get('start', DEFAULT_START), payload.get('freq', DEFAULT_FREQ))
+    dates = [date.strftime('%Y-%m-%d') for date in forecast_index(index, forecast_steps)]
+    return (history, order, forecast_steps, alpha, bool(payload.get('refit', False))), dates
+
+
+class ForecastService:
+    # Fits run in a process pool so the event loop only parses, routes and
+    # serialises. Requests for the same (series, order, steps, alpha, refit)
+    # share one fit while it is running and are served from the cache after.
+
+    def __init__(self, workers=None, cache_size=10000, ttl=300.0):
+        self.executor = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1, initializer=limit_blas_threads, initargs=(1,))
+        self.cache = TTLCache(cache_size, ttl)
+        self.inflight = {}
+        self.stats = {'requests': 0, 'cache_hits': 0, 'coalesced': 0, 'fits': 0, 'errors': 0}
+
+    async def forecast(self, history, order, forecast_steps, alpha=0.05, refit=False):
+        self.stats['requests'] += 1
+        key = (series_hash(history), order, forecast_steps, alpha, refit)
+        result = self.cache.get(key)
+        if result is not None:
+            self.stats['cache_hits'] += 1
+            return result
+        future = self.inflight.get(key)
+        if future is not None:
+            self.stats['coalesced'] += 1
+            return await asyncio.shield(future)
+
+        self.stats['fits'] += 1
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, forecast_job, history, order, forecast_steps, alpha, refit)
+        self.inflight[key] = future
+        try:
+            result = await asyncio.shield(future)
+        except Exception:
+            self.stats['errors'] += 1
+            raise
+        finally:
+            self.inflight.pop(key, None)
+        self.cache.put(key, result)
+        return result
+
+    async def handle_forecast(self, job, dates):
+        history, order, forecast_steps, alpha, refit = job
+        forecast, lower, upper = await self.forecast(history, order, forecast_steps, alpha, refit)
+        return {
+            'dates': dates,
+            'forecast': forecast,
+            'lower': lower,
+            'upper': upper,
+            'order': list(order),
+        }
+
+    async def route(self, method, path, body):
+        if method == 'GET' and path == '/health':
+            return HTTPStatus.OK, {'status': 'ok'}
+        if method == 'GET' and path == '/stats':
+            return HTTPStatus.OK, dict(self.stats, cached=len(self.cache.entries), inflight=len(self.inflight))
+        if path != '/forecast':
+            return HTTPStatus.NOT_FOUND, {'error': f"no route for {path}"}
+        if method != 'POST':
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'error': "use POST"}
+        # Only validation can produce a 400: a fit that fails, e.g. with
+        # LinAlgError (itself a ValueError), is the model's problem, a 422.
+        try:
+            job, dates = parse_request(json.loads(body or b'null'))
+        except (ValueError, TypeError) as e:
+            return HTTPStatus.BAD_REQUEST, {'error': str(e)}
+        try:
+            return HTTPStatus.OK, await self.handle_forecast(job, dates)
+        except Exception as e:
+            print(f"Error occurred: {e}")
+            return HTTPStatus.UNPROCESSABLE_ENTITY, {'error': f"forecast failed: {e}"}
+
+    async def handle_connection(self, reader, writer):
+        # Minimal HTTP/1.1 with keep-alive: one request at a time per
+        # connection, bodies sized by Content-Length.
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY:
+                    status, response = HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {'error': "request body too large"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    status, response = await self.route(method, path.split('?')[0], body)
+                    keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                try:
+                    data = json.dumps(response, allow_nan=False).encode()
+                except ValueError:
+                    status = HTTPStatus.INTERNAL_SERVER_ERROR
+                    data = json.dumps({'error': "response contained non-finite numbers"}).encode()
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+
+async def serve(host, port, workers=None, cache_size=10000, ttl=300.0):
+    service = ForecastService(workers, cache_size, ttl)
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    print(f"Serving forecasts on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP service in front of the ARIMA forecaster.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=0, help="fitting processes (0 uses every core)")
+    parser.add_argument('--cache-size', type=int, default=10000, help="forecasts kept in the result cache")
+    parser.add_argument('--ttl', type=float, default=300.0, help="seconds a cached forecast is served for")
+    args = parser.parse_args()
+    # Workers inherit the environment, so one BLAS thread each keeps them
+    # from oversubscribing the cores.
+    with blas_thread_env(1):
+        try:
+            asyncio.run(serve(args.host, args.port, args.workers or None, args.cache_size, args.ttl))
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
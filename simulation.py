@@ -0,0 +1,175 @@
+import argparse
+import hashlib
+import sys
+import warnings
+
+import numpy as np
+import numpy.polynomial.polynomial as poly
+import pandas as pd
+from scipy.stats import norm
+from statsmodels.tsa.arima_process import arma2ma
+
+from forecasting import DEFAULT_ORDER, fit_arima
+from ingestion import DEFAULT_FREQ, load_histories
+from parallel import parallel_map
+
+DEFAULT_SEED = 0
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+SHOCKS = ('gaussian', 'bootstrap')
+
+
+def product_rng(product_name, seed=DEFAULT_SEED):
+    # One independent stream per (seed, product), derived from the product
+    # name rather than from call order or a shared global state, so the
+    # same product gets the same numbers in any thread, process or batch.
+    key = int.from_bytes(hashlib.sha1(str(product_name).encode()).digest()[:8], 'little')
+    return np.random.Generator(np.random.PCG64(np.random.SeedSequence([seed, key])))
+
+
+def forecast_noise(product_name, size, scale=10.0, seed=DEFAULT_SEED):
+    # Drop-in for np.random.seed(0); np.random.normal(0, scale, size).
+    return product_rng(product_name, seed).normal(loc=0, scale=scale, size=size)
+
+
+def psi_weights(model_fit, steps):
+    # MA(infinity) weights of the fitted model including its differencing:
+    # a unit shock at t moves the forecast at t + h by psi[h].
+    model = model_fit.model
+    ar = poly.polymul(model_fit.polynomial_reduced_ar, poly.polypow([1, -1], model.k_diff))
+    if model.k_seasonal_diff:
+        seasonal = np.zeros(model.seasonal_periods + 1)
+        seasonal[[0, -1]] = 1, -1
+        ar = poly.polymul(ar, poly.polypow(seasonal, model.k_seasonal_diff))
+    return arma2ma(ar, model_fit.polynomial_reduced_ma, lags=steps)
+
+
+def psi_matrix(psi):
+    # Lower-triangular Toeplitz matrix: paths = mean + shocks @ psi_matrix.T
+    steps = len(psi)
+    lags = np.arange(steps)[:, None] - np.arange(steps)[None, :]
+    return np.where(lags >= 0, psi[np.maximum(lags, 0)], 0.0)
+
+
+def model_sigma2(model_fit):
+    return float(dict(zip(model_fit.model.param_names, model_fit.params))['sigma2'])
+
+
+def model_residuals(model_fit):
+    # In-sample one-step residuals after the diffuse burn-in, centred so
+    # resampling them adds no drift.
+    resid = np.asarray(model_fit.resid)[max(model_fit.loglikelihood_burn, 1):]
+    return resid - resid.mean()
+
+
+def draw_shocks(rng, n_paths, steps, shocks='gaussian', sigma2=1.0, residuals=None):
+    if shocks == 'bootstrap':
+        return rng.choice(residuals, size=(n_paths, steps))
+    return rng.normal(0, np.sqrt(sigma2), size=(n_paths, steps))
+
+
+def simulate_paths(model_fit, steps, n_paths=1000, rng=None, shocks='gaussian'):
+    # Returns an (n_paths x steps) array of future demand paths in one
+    # matrix product of shocks with the psi weights.
+    rng = rng or product_rng(None)
+    mean = np.asarray(model_fit.forecast(steps))
+    Psi = psi_matrix(psi_weights(model_fit, steps))
+    return mean + draw_shocks(rng, n_paths, steps, shocks, model_sigma2(model_fit), model_residuals(model_fit)) @ Psi.T
+
+
+def analytic_fan(model_fit, steps, quantiles=DEFAULT_QUANTILES):
+    # Gaussian shocks make every step normal, so the fan needs no paths at
+    # all. Returns (quantiles x steps).
+    forecast = model_fit.get_forecast(steps)
+    mean, se = np.asarray(forecast.predicted_mean), np.asarray(forecast.se_mean)
+    return mean + norm.ppf(np.asarray(quantiles))[:, None] * se
+
+
+def streamed_fan(model_fit, steps, quantiles=DEFAULT_QUANTILES, n_paths=10000, rng=None, shocks='bootstrap', chunk=1000, bins=512):
+    # Quantiles of n_paths simulated paths, generated `chunk` paths at a time
+    # and counted into per-step histograms, so memory is chunk x steps plus
+    # bins x steps whatever n_paths is. The bins span +-6 sd of the fan
+    # (using the residual variance for bootstrap shocks); paths
+    # outside fall into the edge bins. Quantiles are accurate to about one
+    # bin width.
+    rng = rng or product_rng(None)
+    mean = np.asarray(model_fit.forecast(steps))
+    psi = psi_weights(model_fit, steps)
+    Psi = psi_matrix(psi)
+    sigma2, residuals = model_sigma2(model_fit), model_residuals(model_fit)
+    if shocks == 'bootstrap' and len(residuals):
+        sigma2 = max(sigma2, residuals.var())
+    spread = 6 * np.sqrt(sigma2 * np.cumsum(psi ** 2))
+    low, width = mean - spread, 2 * spread / bins
+    counts = np.zeros(steps * bins, dtype=np.int64)
+    offsets = np.arange(steps) * bins
+    for start in range(0, n_paths, chunk):
+        paths = mean + draw_shocks(rng, min(chunk, n_paths - start), steps, shocks, sigma2, residuals) @ Psi.T
+        cells = np.clip(((paths - low) / width).astype(np.int64), 0, bins - 1)
+        counts += np.bincount((cells + offsets).ravel(), minlength=steps * bins)
+    cumulative = np.cumsum(counts.reshape(steps, bins), axis=1) / n_paths
+    fan = np.empty((len(quantiles), steps))
+    for step in range(steps):
+        # Linear interpolation inside the bin where the CDF crosses q.
+        edges = low[step] + width[step] * np.arange(1, bins + 1)
+        fan[:, step] = np.interp(quantiles, np.r_[0.0, cumulative[step]], np.r_[low[step], edges])
+    return fan
+
+
+def fan_task(task):
+    product_name, history, order, steps, quantiles, shocks, n_paths, seed = task
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        try:
+            model_fit = fit_arima(history, order)
+            if shocks == 'gaussian' and not n_paths:
+                return analytic_fan(model_fit, steps, quantiles)
+            return streamed_fan(model_fit, steps, quantiles, n_paths, product_rng(product_name, seed), shocks)
+        except Exception as e:
+            print(f"Error occurred while simulating {product_name}: {e}", file=sys.stderr)
+            return np.full((len(quantiles), steps), np.nan)
+
+
+def simulate_fans(histories, steps, quantiles=DEFAULT_QUANTILES, order=DEFAULT_ORDER, shocks='gaussian', n_paths=0, seed=DEFAULT_SEED, workers=1):
+    # Quantile fans for a whole catalogue: {product: (quantiles x steps)}.
+    # Gaussian fans are analytic unless n_paths asks for simulation.
+    tasks = [
+        (product_name, np.asarray(history, dtype=float), tuple(order), steps, tuple(quantiles), shocks, n_paths, seed)
+        for product_name, history in histories.items()
+    ]
+    return dict(zip(histories, parallel_map(fan_task, tasks, workers)))
+
+
+def fan_frame(fans, quantiles):
+    frames = []
+    for product_name, fan in fans.items():
+        frame = pd.DataFrame(fan.T, columns=[f"q{q:g}" for q in quantiles])
+        frame.insert(0, 'step', np.arange(1, fan.shape[1] + 1))
+        frame.insert(0, 'product_name', product_name)
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate demand scenarios per product and write their quantile fans.")
+    parser.add_argument('input', help="CSV or Parquet file in long format (one row per product and date)")
+    parser.add_argument('output', help="CSV file to write one row per product and step with a column per quantile")
+    parser.add_argument('--steps', type=int, default=12)
+    parser.add_argument('--quantiles', type=float, nargs='+', default=list(DEFAULT_QUANTILES))
+    parser.add_argument('--order', nargs=3, type=int, default=list(DEFAULT_ORDER), metavar=('P', 'D', 'Q'))
+    parser.add_argument('--shocks', choices=SHOCKS, default='gaussian', help="normal shocks with the fitted variance, or resampled model residuals")
+    parser.add_argument('--paths', type=int, default=0, help="simulated paths per product (0 = analytic fan; bootstrap defaults to 10000)")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--workers', type=int, default=1, help="number of worker processes (0 uses every core)")
+    parser.add_argument('--freq', default=DEFAULT_FREQ)
+    args = parser.parse_args(argv)
+
+    n_paths = args.paths or (10000 if args.shocks == 'bootstrap' else 0)
+    histories = load_histories(args.input, args.freq)
+    fans = simulate_fans(histories, args.steps, args.quantiles, tuple(args.order), args.shocks, n_paths, args.seed, args.workers or None)
+    fan_frame(fans, args.quantiles).to_csv(args.output, index=False)
+    print(f"Wrote quantile fans of {len(fans)} products into {args.output}.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+
+from ingestion import forecast_index, stream_series
+
+
+def write_csv(path, rows):
+    pd.DataFrame(rows, columns=['product_name', 'date', 'demand']).to_csv(path, index=False)
+    return str(path)
+
+
+def test_stream_series_yields_nothing_for_a_header_only_file(tmp_path):
+    path = write_csv(tmp_path / 'empty.csv', [])
+    assert list(stream_series(path)) == []
+
+
+def test_stream_series_joins_products_split_across_chunks(tmp_path):
+    rows = [('A', f"2023-{month:02d}-10", month) for month in range(1, 6)]
+    rows += [('A', '2023-05-20', 100), ('B', '2023-01-05', 7), ('B', '2023-03-05', 9)]
+    path = write_csv(tmp_path / 'demand.csv', rows)
+    series = dict(stream_series(path, chunksize=2))
+    assert list(series) == ['A', 'B']
+    assert series['A'].tolist() == [1, 2, 3, 4, 105]
+    assert series['B'].tolist() == [7, 0, 9]
+    assert series['B'].index[-1] == pd.Timestamp('2023-03-31')
+
+
+def test_stream_series_rejects_non_contiguous_products(tmp_path):
+    path = write_csv(tmp_path / 'shuffled.csv', [('A', '2023-01-31', 1), ('B', '2023-01-31', 2), ('A', '2023-02-28', 3)])
+    with pytest.raises(ValueError, match='not contiguous'):
+        list(stream_series(path, chunksize=1))
+
+
+def test_forecast_index_uses_the_series_frequency_for_short_histories():
+    weekly = pd.date_range('2023-01-01', periods=2, freq='W')
+    assert forecast_index(weekly, 3).tolist() == [pd.Timestamp('2023-01-15'), pd.Timestamp('2023-01-22'), pd.Timestamp('2023-01-29')]
+    monthly = pd.DatetimeIndex(['2023-01-31', '2023-02-28'])
+    assert forecast_index(monthly, 2).tolist() == [pd.Timestamp('2023-03-31'), pd.Timestamp('2023-04-30')]
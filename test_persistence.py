@@ -0,0 +1,58 @@
+import mongomock
+import pytest
+
+import persistence
+from persistence import ForecastWriter, ensure_indexes
+
+
+@pytest.fixture
+def collection():
+    collection = mongomock.MongoClient().db[persistence.COLLECTION_NAME]
+    ensure_indexes(collection)
+    return collection
+
+
+def test_unique_index_only_covers_documents_with_a_run_id(collection):
+    index = collection.index_information()['product_name_1_run_id_1']
+    assert index['unique']
+    assert index['partialFilterExpression'] == {'run_id': {'$exists': True}}
+    # Legacy documents (no run_id) and demand.py documents (no product_name)
+    # may repeat.
+    collection.insert_many([{'product_name': 'A'}, {'product_name': 'A'}, {'demand': [1]}, {'demand': [2]}])
+    assert collection.count_documents({}) == 4
+
+
+def test_writer_flushes_at_flush_size_and_on_close(collection):
+    writer = ForecastWriter(collection, run_id='run-1', flush_size=2, flush_interval=3600)
+    writer.add({'product_name': 'A', 'forecast': [1.0]})
+    assert collection.count_documents({}) == 0
+    writer.add({'product_name': 'B', 'forecast': [2.0]})
+    assert collection.count_documents({}) == 2
+    with writer:
+        writer.add({'product_name': 'C', 'forecast': [3.0]})
+    assert writer.written == 3
+    assert collection.count_documents({'run_id': 'run-1'}) == 3
+
+
+def test_writer_upserts_per_product_and_run(collection):
+    with ForecastWriter(collection, run_id='run-1') as writer:
+        writer.add({'product_name': 'A', 'forecast': [1.0]})
+    with ForecastWriter(collection, run_id='run-1') as writer:
+        writer.add({'product_name': 'A', 'forecast': [5.0]})
+    with ForecastWriter(collection, run_id='run-2') as writer:
+        writer.add({'product_name': 'A', 'forecast': [7.0]})
+    assert collection.count_documents({'product_name': 'A'}) == 2
+    assert collection.find_one({'run_id': 'run-1'})['forecast'] == [5.0]
+
+
+def test_get_collection_builds_indexes_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr(persistence, 'ensure_indexes', lambda collection: calls.append(collection.name))
+    uri = 'mongomock://test'
+    try:
+        first = persistence.get_collection('db', uri=uri)
+        second = persistence.get_collection('db', uri=uri)
+        assert calls == [persistence.COLLECTION_NAME]
+        assert first.full_name == second.full_name
+    finally:
+        persistence.close_clients()